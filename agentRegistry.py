@@ -0,0 +1,161 @@
+# agentRegistry.py
+# ----------------
+# Finds the module that defines an agent class without importing every
+# agents module on the path.
+
+"""
+pacman.py used to find an agent by importing each *gents.py module in the
+PYTHONPATH directories (and the current one) until one of them had the
+name.  The registry answers the same question from an index of the
+classes each of those modules defines, found by parsing their source, so
+only the module that is needed gets imported.
+
+The index is kept in INDEX_FILE.  An entry is re-parsed whenever the
+module's modification time or size changes, and entries for modules that
+are gone are dropped.  An agent can also be named explicitly as
+'module:Class', which skips the index altogether.
+"""
+
+import json
+import os
+import sys
+
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.agentIndex.json')
+INDEX_VERSION = 1
+MODULE_SUFFIX = 'gents.py'
+
+
+def agentDirectories():
+    "The directories searched for agents modules, in the order loadAgent used"
+    pythonPathStr = os.path.expandvars("$PYTHONPATH")
+    if pythonPathStr.find(';') == -1:
+        pythonPathDirs = pythonPathStr.split(':')
+    else:
+        pythonPathDirs = pythonPathStr.split(';')
+    pythonPathDirs.append('.')
+    return [moduleDir for moduleDir in pythonPathDirs if os.path.isdir(moduleDir)]
+
+
+def importModule(moduleName):
+    "Imports moduleName (which may be dotted) with the import statement's machinery"
+    __import__(moduleName)
+    return sys.modules[moduleName]
+
+
+def definedClasses(fileName):
+    "The names of the classes defined at the top level of a Python source file"
+    import ast
+    f = open(fileName, 'rb')
+    try:
+        tree = ast.parse(f.read(), fileName)
+    finally:
+        f.close()
+    return [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
+
+
+class AgentRegistry:
+    """
+    Maps agent class names to the agents modules that define them, using an
+    index that is cached on disk and refreshed per module.
+    """
+
+    def __init__(self, indexFile = INDEX_FILE):
+        self.indexFile = indexFile
+        self.modules = None
+
+    def loadIndex(self):
+        self.modules = {}
+        try:
+            f = open(self.indexFile)
+            try:
+                index = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            return
+        if index.get('version') == INDEX_VERSION:
+            self.modules = index['modules']
+
+    def saveIndex(self):
+        # Written under a temporary name so a concurrent reader never sees half an index
+        tempName = '%s.%d.tmp' % (self.indexFile, os.getpid())
+        try:
+            f = open(tempName, 'w')
+            try:
+                json.dump({'version': INDEX_VERSION, 'modules': self.modules}, f, indent = 1, sort_keys = True)
+            finally:
+                f.close()
+            os.replace(tempName, self.indexFile)
+        except IOError:
+            # A read-only checkout just goes without the cache
+            try: os.remove(tempName)
+            except OSError: pass
+
+    def candidates(self):
+        """
+        Yields (moduleName, fileName, classNames) for every agents module in
+        search order, re-parsing the ones that changed since they were indexed.
+        """
+        if self.modules is None:
+            self.loadIndex()
+        changed = False
+        seen = set()
+        for moduleDir in agentDirectories():
+            for fileName in sorted(os.listdir(moduleDir)):
+                if not fileName.endswith(MODULE_SUFFIX):
+                    continue
+                path = os.path.abspath(os.path.join(moduleDir, fileName))
+                seen.add(path)
+                stat = os.stat(path)
+                entry = self.modules.get(path)
+                if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                    try:
+                        classes = definedClasses(path)
+                    except (SyntaxError, ValueError):
+                        classes = []
+                    entry = {'mtime': stat.st_mtime, 'size': stat.st_size, 'classes': classes}
+                    self.modules[path] = entry
+                    changed = True
+                yield fileName[:-3], path, entry['classes']
+        stale = [path for path in self.modules if path not in seen]
+        for path in stale:
+            del self.modules[path]
+        if changed or stale:
+            self.saveIndex()
+
+    def findModule(self, name):
+        "The names of the modules that define the class name, in search order"
+        modules = []
+        for moduleName, path, classes in self.candidates():
+            if name in classes and moduleName not in modules:
+                modules.append(moduleName)
+        return modules
+
+    def load(self, name, nographics = False):
+        """
+        Returns the agent class called name, or given as 'module:Class'.
+        Only the module that defines it is imported.
+        """
+        if ':' in name:
+            moduleName, className = name.split(':', 1)
+            module = importModule(moduleName)
+            if not hasattr(module, className):
+                raise Exception('The module %s has no agent %s' % (moduleName, className))
+            return self._checked(module, moduleName, className, nographics)
+
+        for moduleName in self.findModule(name):
+            try:
+                module = importModule(moduleName)
+            except ImportError:
+                continue
+            if hasattr(module, name):
+                return self._checked(module, moduleName, name, nographics)
+        raise Exception('The agent ' + name + ' is not specified in any *Agents.py.')
+
+    def _checked(self, module, moduleName, className, nographics):
+        if nographics and moduleName == 'keyboardAgents':
+            raise Exception('Using the keyboard requires graphics (not text display)')
+        return getattr(module, className)
+
+
+REGISTRY = AgentRegistry()
@@ -0,0 +1,83 @@
+# batchBenchmark.py
+# -----------------
+# Compares the rounds per second of BatchPacmanEnv with stepping the same
+# number of games one GameState at a time.
+#
+# USAGE:      python benchmarks/batchBenchmark.py [-l LAYOUT] [-k GHOSTS] [-n GAMES] [-r ROUNDS]
+#
+# Pacman and the ghosts all move uniformly at random.  Finished games are
+# restarted so that every round steps n games.
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import numpy
+import layout
+from pacman import GameState
+from pacmanBatch import BatchPacmanEnv
+
+layout.LAYOUT_CACHE_DIR = None  # Time the games, not compiling layouts into the checkout
+
+
+def timeGameStates(lay, numGhosts, numGames, numRounds):
+    "Seconds taken to play numRounds rounds of numGames games through GameState"
+    def newState():
+        state = GameState()
+        state.initialize(lay, numGhosts)
+        return state
+
+    states = [newState() for i in range(numGames)]
+    start = time.perf_counter()
+    for r in range(numRounds):
+        for i in range(numGames):
+            state = states[i]
+            for agentIndex in range(state.getNumAgents()):
+                state = state.generateSuccessor(agentIndex, random.choice(state.getLegalActions(agentIndex)))
+                if state.isWin() or state.isLose():
+                    state = newState()
+                    break
+            states[i] = state
+    return time.perf_counter() - start
+
+
+def timeBatch(lay, numGhosts, numGames, numRounds):
+    "Seconds taken to play numRounds rounds of numGames games with BatchPacmanEnv"
+    env = BatchPacmanEnv(0)
+    generator = numpy.random.default_rng(0)
+    env.reset(lay, numGames, numGhosts)
+    start = time.perf_counter()
+    for r in range(numRounds):
+        legal = env.getLegalActions(0)
+        picks = generator.random(numGames) * legal.sum(axis = 1)
+        actions = numpy.argmax(legal.cumsum(axis = 1) > picks[:, numpy.newaxis], axis = 1)
+        env.step(actions)
+        env.restart(env.done)
+    return time.perf_counter() - start
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser()
+    parser.add_option('-l', '--layout', dest = 'layout', default = 'mediumClassic')
+    parser.add_option('-k', '--numghosts', dest = 'numGhosts', type = 'int', default = 4)
+    parser.add_option('-n', '--numGames', dest = 'numGames', type = 'int', default = 1000)
+    parser.add_option('-r', '--numRounds', dest = 'numRounds', type = 'int', default = 100)
+    options, _ = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    random.seed(0)
+    lay = layout.getLayout(options.layout)
+    total = options.numGames * options.numRounds
+    print('%s, %d games, %d rounds' % (options.layout, options.numGames, options.numRounds))
+    for name, timer in [('GameState', timeGameStates), ('BatchPacmanEnv', timeBatch)]:
+        elapsed = timer(lay, options.numGhosts, options.numGames, options.numRounds)
+        print('  %-16s %10.0f game rounds/s' % (name, total / elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,93 @@
+# observationBenchmark.py
+# -----------------------
+# Measures what it costs Game.run to hand each agent an observation of the
+# game state on every move.
+#
+# USAGE:      python benchmarks/observationBenchmark.py [-l LAYOUT] [-k GHOSTS] [-n GAMES]
+#
+# Each game is played twice with the same random seed: once with observations
+# built the way Game.run used to build them (GameState.deepCopy, including a
+# re-parse of the layout text), and once with the copy-on-write observations
+# from GameState.makeObservation.  The average time per move is reported for
+# both, along with the time spent on the observation copy alone.
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import layout
+import pacman
+import pacmanAgents
+import ghostAgents
+import textDisplay
+from pacman import GameState
+
+layout.LAYOUT_CACHE_DIR = None  # Time the games, not compiling layouts into the checkout
+
+
+def reparsingDeepCopy(state, agentIndex = 0):
+    "The observation Game.run used to build: a deep copy that re-parses the layout"
+    copy = GameState(state)
+    copy.data = state.data.deepCopy()
+    copy.data.layout = layout.Layout(state.data.layout.layoutText[:])
+    return copy
+
+
+def timeGames(lay, numGhosts, numGames, makeObservation):
+    """
+    Plays numGames quiet games with a LeftTurnAgent against RandomGhosts using
+    makeObservation to build observations.  Returns (seconds per move, seconds
+    per observation).
+    """
+    original = GameState.makeObservation
+    copyTime = [0.0]
+
+    def timedObservation(state, agentIndex):
+        start = time.perf_counter()
+        observation = makeObservation(state, agentIndex)
+        copyTime[0] += time.perf_counter() - start
+        return observation
+
+    GameState.makeObservation = timedObservation
+    try:
+        rules = pacman.ClassicGameRules()
+        moves = 0
+        start = time.perf_counter()
+        for i in range(numGames):
+            random.seed(i)
+            ghosts = [ghostAgents.RandomGhost(j + 1) for j in range(numGhosts)]
+            game = rules.newGame(lay, pacmanAgents.LeftTurnAgent(), ghosts, textDisplay.NullGraphics(), quiet = True)
+            game.run()
+            moves += len(game.moveHistory)
+        elapsed = time.perf_counter() - start
+    finally:
+        GameState.makeObservation = original
+    return elapsed / moves, copyTime[0] / moves
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser()
+    parser.add_option('-l', '--layout', dest = 'layout', default = 'mediumClassic')
+    parser.add_option('-k', '--numghosts', dest = 'numGhosts', type = 'int', default = 4)
+    parser.add_option('-n', '--numGames', dest = 'numGames', type = 'int', default = 20)
+    options, _ = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    lay = layout.getLayout(options.layout)
+    numGhosts = min(options.numGhosts, lay.getNumGhosts())
+    print('%s, %d ghosts (of %d requested), %d games' % (options.layout, numGhosts, options.numGhosts, options.numGames))
+
+    results = [('deepCopy (before)', reparsingDeepCopy),
+               ('makeObservation (after)', GameState.makeObservation)]
+    for name, makeObservation in results:
+        perMove, perCopy = timeGames(lay, numGhosts, options.numGames, makeObservation)
+        print('  %-24s %8.1f us/move  %8.1f us/observation' % (name, perMove * 1e6, perCopy * 1e6))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,118 @@
+# startupBenchmark.py
+# -------------------
+# Measures how long quiet pacman.py runs take from a cold interpreter, and
+# where their import time goes.
+#
+# USAGE:      python benchmarks/startupBenchmark.py [-n RUNS] [-k TOP] [--budget MS]
+#
+# Each command is started RUNS times in a fresh interpreter and the fastest
+# and median wall times are reported.  One more run of each under
+# python -X importtime gives the per-module breakdown: the total time spent
+# importing, the TOP modules by their own (self) import time, and every
+# module of this project that was imported.
+#
+# With --budget, the run fails (exit status 1) if the import time of any
+# command goes over MS milliseconds.  That makes it usable as a check that
+# Tk, the graphics or the grading modules have not crept back into a
+# headless startup.
+
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [('SearchAgent on tinyMaze', ['-q', '-p', 'SearchAgent', '-l', 'tinyMaze']),
+            ('GreedyAgent on testClassic', ['-q', '-p', 'GreedyAgent', '-l', 'testClassic', '-f'])]
+
+
+def environment():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(['src', 'support', '.'])
+    return env
+
+
+def runPacman(arguments, options = ()):
+    "Runs pacman.py in a fresh interpreter and returns (seconds, stderr)"
+    command = [sys.executable] + list(options) + ['pacman.py'] + arguments
+    start = time.perf_counter()
+    process = subprocess.run(command, cwd = ROOT, env = environment(),
+                             stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, universal_newlines = True)
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise Exception('pacman.py %s failed:\n%s' % (' '.join(arguments), process.stderr))
+    return elapsed, process.stderr
+
+
+def parseImportTimes(stderr):
+    """
+    Reads the output of python -X importtime into a list of (module, depth,
+    self microseconds, cumulative microseconds), in import order.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if not fields[0].strip().isdigit():
+            continue  # The column headings
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    return imports
+
+
+def projectModules():
+    "The names of the modules that belong to this project"
+    names = set()
+    for directory in [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]:
+        for fileName in os.listdir(directory):
+            if fileName.endswith('.py'):
+                names.add(fileName[:-3])
+                names.add('support.' + fileName[:-3])
+    return names
+
+
+def reportImports(imports, top):
+    "Prints the breakdown and returns the total import time in milliseconds"
+    total = sum([cumulative for name, depth, own, cumulative in imports if depth == 0]) / 1000.0
+    print('  import time:            %8.1f ms in %d modules' % (total, len(imports)))
+    print('  slowest %d by self time:' % top)
+    for name, depth, own, cumulative in sorted(imports, key = lambda i: -i[2])[:top]:
+        print('    %-30s %8.1f ms  (%.1f ms with its imports)' % (name, own / 1000.0, cumulative / 1000.0))
+    ours = projectModules()
+    print('  project modules:')
+    for name, depth, own, cumulative in imports:
+        if name in ours:
+            print('    %-30s %8.1f ms' % (name, own / 1000.0))
+    return total
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser()
+    parser.add_option('-n', '--runs', dest = 'runs', type = 'int', default = 10)
+    parser.add_option('-k', '--top', dest = 'top', type = 'int', default = 10)
+    parser.add_option('--budget', dest = 'budget', type = 'float', default = None,
+                      help = 'Fail if a command spends more than this many milliseconds importing')
+    options, _ = parser.parse_args(argv)
+
+    overBudget = []
+    for name, arguments in COMMANDS:
+        print('%s: python pacman.py %s' % (name, ' '.join(arguments)))
+        times = sorted([runPacman(arguments)[0] for i in range(options.runs)])
+        print('  wall time over %d runs:  %8.1f ms best, %.1f ms median' % (
+            options.runs, times[0] * 1000, times[len(times) // 2] * 1000))
+        total = reportImports(parseImportTimes(runPacman(arguments, ['-X', 'importtime'])[1]), options.top)
+        if options.budget is not None and total > options.budget:
+            overBudget.append(name)
+        print('')
+
+    if overBudget:
+        print('Over the import budget of %.1f ms: %s' % (options.budget, ', '.join(overBudget)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+# stateBenchmark.py
+# -----------------
+# Measures the memory held by each GameState and how many successors per
+# second GameState.generateSuccessor produces.
+#
+# USAGE:      python benchmarks/stateBenchmark.py [-l LAYOUT] [-k GHOSTS] [-n STATES]
+#
+# States are collected along random games.  Bytes per state counts only the
+# objects a successor owns (the GameState, its GameStateData, agent states,
+# configurations, position tuples and small lists); the layout and the food
+# grid are shared between states and are left out.
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import layout
+from pacman import GameState
+
+layout.LAYOUT_CACHE_DIR = None  # Time the games, not compiling layouts into the checkout
+
+
+def objectBytes(obj):
+    "The size of obj plus its __dict__, if it has one"
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def stateBytes(state):
+    "The number of bytes owned by one GameState, excluding the shared layout and food"
+    data = state.data
+    size = objectBytes(state) + objectBytes(data)
+    size += sys.getsizeof(data.agentStates) + sys.getsizeof(data.capsules) + sys.getsizeof(data._eaten)
+    for agentState in data.agentStates:
+        size += objectBytes(agentState)
+        size += objectBytes(agentState.configuration) + sys.getsizeof(agentState.configuration.pos)
+    return size
+
+
+def collectStates(lay, numGhosts, numStates):
+    "Plays random games until numStates states have been seen"
+    states = []
+    while len(states) < numStates:
+        state = GameState()
+        state.initialize(lay, numGhosts)
+        agentIndex = 0
+        while not (state.isWin() or state.isLose()) and len(states) < numStates:
+            states.append(state)
+            state = state.generateSuccessor(agentIndex, random.choice(state.getLegalActions(agentIndex)))
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+    return states
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser()
+    parser.add_option('-l', '--layout', dest = 'layout', default = 'mediumClassic')
+    parser.add_option('-k', '--numghosts', dest = 'numGhosts', type = 'int', default = 4)
+    parser.add_option('-n', '--numStates', dest = 'numStates', type = 'int', default = 20000)
+    options, _ = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    random.seed(0)
+    lay = layout.getLayout(options.layout)
+    states = collectStates(lay, options.numGhosts, options.numStates)
+    numAgents = states[0].getNumAgents()
+
+    totalBytes = sum([stateBytes(state) for state in states])
+    print('%s, %d agents, %d states' % (options.layout, numAgents, len(states)))
+    print('  bytes per GameState:      %8.1f' % (float(totalBytes) / len(states)))
+
+    moves = []
+    for i, state in enumerate(states):
+        agentIndex = i % numAgents
+        if not (state.isWin() or state.isLose()):
+            for action in state.getLegalActions(agentIndex):
+                moves.append((state, agentIndex, action))
+    start = time.perf_counter()
+    for state, agentIndex, action in moves:
+        state.generateSuccessor(agentIndex, action)
+    elapsed = time.perf_counter() - start
+    print('  successors per second:    %8.0f' % (len(moves) / elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
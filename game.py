@@ -22,7 +22,7 @@
 
 from util import *
 import time, os
-import traceback
+import random
 import sys
 
 
@@ -81,6 +81,8 @@ class Configuration:
     The convention for positions, like a graph, is that (0,0) is the lower left corner, x increases
     horizontally and y increases vertically.  Therefore, north is the direction of increasing y, or (0,1).
     """
+    # A new Configuration is made for every move, so it carries no __dict__
+    __slots__ = ('pos', 'direction')
     
     def __init__(self, pos, direction):
         self.pos = pos
@@ -129,6 +131,8 @@ class AgentState:
     """
     AgentStates hold the state of an agent (configuration, speed, scared, etc).
     """
+    # Every agent state is copied for every successor, so it carries no __dict__
+    __slots__ = ('start', 'configuration', 'isPacman', 'scaredTimer', 'numCarrying', 'numReturned')
     
     def __init__(self, startConfiguration, isPacman):
         self.start = startConfiguration
@@ -207,13 +211,10 @@ class Grid:
     
     def __hash__(self):
         # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
+        # Cell i (column by column) is bit i of h; parsing one string of digits
+        # avoids doubling an ever larger int once per cell
+        digits = ''.join(['1' if i else '0' for l in self.data for i in l])
+        h = int(digits[::-1], 2) if digits else 0
         return hash(h)
     
     def copy(self):
@@ -229,9 +230,32 @@ class Grid:
         g.data = self.data
         return g
     
+    def withCell(self, x, y, value):
+        """
+        Returns a copy of this grid with cell (x,y) set to value.  Only column x
+        is duplicated; the copy shares every other column with this grid, so
+        neither grid should be modified in place afterwards.
+        """
+        g = Grid(self.width, self.height)
+        g.data = self.data[:]
+        g.data[x] = self.data[x][:]
+        g.data[x][y] = value
+        return g
+    
     def count(self, item = True):
         return sum([x.count(item) for x in self.data])
     
+    def toBitGrid(self):
+        "Returns a BitGrid with the same cells"
+        bits = 0
+        base = 1
+        for column in self.data:
+            for cell in column:
+                if cell:
+                    bits |= base
+                base <<= 1
+        return BitGrid(self.width, self.height, bits = bits)
+    
     def asList(self, key = True):
         list = []
         for x in range(self.width):
@@ -289,6 +313,231 @@ class Grid:
             else:
                 bools.append(False)
         return bools
+    
+    def readOnly(self):
+        "Returns a ReadOnlyGrid view of this grid"
+        return ReadOnlyGrid(self)
+
+
+class ReadOnlyGrid(Grid):
+    """
+    A view of a Grid that refuses writes: columns are tuples, made the first
+    time each one is read, and assigning a column raises.  Successor states
+    keep their food in one of these, so observations can hand it to agents as
+    it is, and a state can trust the food count and hash it has cached.  Its
+    data must not be written through any other grid.  copy and deepCopy return an
+    ordinary Grid that can be written to; withCell, as on any Grid, returns a
+    new Grid and leaves this one alone.
+    """
+    
+    def __init__(self, grid):
+        self.CELLS_PER_INT = grid.CELLS_PER_INT
+        self.width = grid.width
+        self.height = grid.height
+        self.data = grid.data
+        self._columns = [None] * grid.width
+    
+    def __getitem__(self, i):
+        column = self._columns[i]
+        if column is None:
+            column = self._columns[i] = tuple(self.data[i])
+        return column
+    
+    def __setitem__(self, key, item):
+        raise Exception('This grid is read-only; write into a copy of it')
+    
+    def shallowCopy(self):
+        return self
+    
+    def readOnly(self):
+        return self
+
+
+try:
+    _popCount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popCount(n):
+        return bin(n).count('1')
+
+
+class BitGrid:
+    """
+    A 2-dimensional array of booleans backed by a single arbitrary-precision
+    integer (a bitboard): cell (x,y) is bit x * height + y, the same cell order
+    Grid uses for hashing and packBits.
+
+    Data is accessed via grid[x][y] exactly like a Grid, so it can stand in for
+    the walls or food of a layout.  Because the bits are an immutable int,
+    copy() is O(1), count() is a popcount, hashing is hashing one int, and two
+    grids of the same size can be combined with &, |, ^ and - (and-not).
+    """
+    
+    def __init__(self, width, height, initialValue = False, bits = 0):
+        if initialValue not in [False, True]:
+            raise Exception('Grids can only contain booleans')
+        self.width = width
+        self.height = height
+        self._mask = (1 << (width * height)) - 1
+        self.bits = self._mask if initialValue else bits
+    
+    def __getitem__(self, x):
+        # A column is a small view onto the bits, made on demand, so a fresh
+        # copy costs nothing until it is indexed and then only per column used
+        if x < 0:
+            x += self.width
+        if not 0 <= x < self.width:
+            raise IndexError('BitGrid index out of range')
+        return _BitGridColumn(self, x)
+    
+    def __len__(self):
+        return self.width
+    
+    def __iter__(self):
+        for x in range(self.width):
+            yield self[x]
+    
+    @property
+    def data(self):
+        "A list-of-lists snapshot of the cells, as stored by Grid"
+        return [list(column) for column in self]
+    
+    def __str__(self):
+        out = [[str(self[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+    
+    def __eq__(self, other):
+        if other == None:
+            return False
+        if isinstance(other, BitGrid):
+            return self.width == other.width and self.height == other.height and self.bits == other.bits
+        return self.data == other.data
+    
+    def __hash__(self):
+        return hash(self.bits)
+    
+    def _sameShape(self, other):
+        if (self.width, self.height) != (other.width, other.height):
+            raise Exception('Grids must have the same dimensions')
+    
+    def __and__(self, other):
+        self._sameShape(other)
+        return BitGrid(self.width, self.height, bits = self.bits & other.bits)
+    
+    def __or__(self, other):
+        self._sameShape(other)
+        return BitGrid(self.width, self.height, bits = self.bits | other.bits)
+    
+    def __xor__(self, other):
+        self._sameShape(other)
+        return BitGrid(self.width, self.height, bits = self.bits ^ other.bits)
+    
+    def __sub__(self, other):
+        self._sameShape(other)
+        return BitGrid(self.width, self.height, bits = self.bits & ~other.bits)
+    
+    def __invert__(self):
+        return BitGrid(self.width, self.height, bits = ~self.bits & self._mask)
+    
+    def copy(self):
+        return BitGrid(self.width, self.height, bits = self.bits)
+    
+    def deepCopy(self):
+        return self.copy()
+    
+    def shallowCopy(self):
+        # The bits are immutable, so a copy is as cheap as sharing them
+        return self.copy()
+    
+    def withCell(self, x, y, value):
+        "Returns a copy of this grid with cell (x,y) set to value"
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError('BitGrid index out of range')
+        bit = 1 << (x * self.height + y)
+        return BitGrid(self.width, self.height, bits = self.bits | bit if value else self.bits & ~bit)
+    
+    def count(self, item = True):
+        ones = _popCount(self.bits)
+        if item:
+            return ones
+        return self.width * self.height - ones
+    
+    def asList(self, key = True):
+        bits = self.bits if key else ~self.bits & self._mask
+        list = []
+        while bits:
+            lowest = bits & -bits
+            index = lowest.bit_length() - 1
+            list.append((index // self.height, index % self.height))
+            bits ^= lowest
+        return list
+    
+    def packBits(self):
+        """
+        Returns the same efficient int list representation as Grid.packBits
+
+        (width, height, bitPackedInts...)
+        """
+        cellsPerInt = 30
+        bits = [self.width, self.height]
+        numCells = self.width * self.height
+        for start in range(0, numCells, cellsPerInt):
+            size = min(cellsPerInt, numCells - start)
+            chunk = (self.bits >> start) & ((1 << size) - 1)
+            # Grid packs the first cell of each chunk into the highest bit
+            packed = int(format(chunk, '0%db' % size)[::-1], 2) << (cellsPerInt - size)
+            bits.append(packed)
+        if numCells % cellsPerInt == 0:
+            bits.append(0)
+        return tuple(bits)
+    
+    def toGrid(self):
+        g = Grid(self.width, self.height)
+        g.data = self.data
+        return g
+    
+    def toBitGrid(self):
+        return self.copy()
+
+
+class _BitGridColumn:
+    """
+    One column (fixed x) of a BitGrid, so that grid[x][y] reads and writes
+    the grid's bits.
+    """
+    __slots__ = ('grid', 'offset', 'height')
+    
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.offset = x * grid.height
+        self.height = grid.height
+    
+    def _bit(self, y):
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError('BitGrid index out of range')
+        return self.offset + y
+    
+    def __getitem__(self, y):
+        return (self.grid.bits >> self._bit(y)) & 1 == 1
+    
+    def __setitem__(self, y, value):
+        if value:
+            self.grid.bits |= 1 << self._bit(y)
+        else:
+            self.grid.bits &= ~(1 << self._bit(y))
+    
+    def __len__(self):
+        return self.height
+    
+    def __iter__(self):
+        bits = self.grid.bits >> self.offset
+        for y in range(self.height):
+            yield (bits >> y) & 1 == 1
+    
+    def count(self, item = True):
+        return list(self).count(item)
 
 
 def reconstituteGrid(bitRep):
@@ -396,22 +645,88 @@ class Actions:
     getSuccessor = staticmethod(getSuccessor)
 
 
+class ZobristKeys:
+    """
+    Random 64-bit keys for every cell of a board of a given size, one key per
+    cell for food and one for capsules.  The Zobrist hash of a set of cells is
+    the XOR of their keys, so adding or removing a single cell updates the hash
+    in O(1) instead of rehashing the whole board.
+
+    Keys come from their own seeded generator, so they are the same in every
+    run and never disturb the game's random number stream.
+    """
+    CACHE = {}
+    
+    def __init__(self, width, height):
+        rng = random.Random('zobrist %d %d' % (width, height))
+        self.height = height
+        self.food = [rng.getrandbits(64) for i in range(width * height)]
+        self.capsule = [rng.getrandbits(64) for i in range(width * height)]
+    
+    def forBoard(width, height):
+        if (width, height) not in ZobristKeys.CACHE:
+            ZobristKeys.CACHE[(width, height)] = ZobristKeys(width, height)
+        return ZobristKeys.CACHE[(width, height)]
+    
+    forBoard = staticmethod(forBoard)
+    
+    def foodKey(self, x, y):
+        return self.food[x * self.height + y]
+    
+    def capsuleKey(self, x, y):
+        return self.capsule[x * self.height + y]
+    
+    def hashFood(self, grid):
+        h = 0
+        for x, y in grid.asList():
+            h ^= self.food[x * self.height + y]
+        return h
+    
+    def hashCapsules(self, capsules):
+        h = 0
+        for x, y in capsules:
+            h ^= self.capsule[x * self.height + y]
+        return h
+
+
+def _frozenFood(food):
+    """
+    The food for a successor of a state whose food is food.  A ReadOnlyGrid is
+    shared as it is.  Any other Grid could still be written to through the
+    state it belongs to, so the successor gets a read-only copy of it; only
+    then can the successor trust its cached food count and hash.
+    """
+    if isinstance(food, ReadOnlyGrid):
+        return food
+    if isinstance(food, Grid):
+        return ReadOnlyGrid(food.copy())
+    return food.shallowCopy()
+
+
 class GameStateData:
     """
 
     """
+    # One of these is made for every successor, so it carries no __dict__
+    __slots__ = ('food', 'capsules', 'agentStates', 'layout', 'score', 'scoreChange',
+                 '_eaten', '_foodEaten', '_foodAdded', '_capsuleEaten', '_agentMoved', '_lose', '_win',
+                 '_foodHash', '_numFood', '_foodCacheOf', '_capsuleHash', '_capsuleHashOf')
     
     def __init__(self, prevState = None):
         """
         Generates a new data packet by copying information from its predecessor.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
+            self.food = _frozenFood(prevState.food)
             self.capsules = prevState.capsules[:]
             self.agentStates = self.copyAgentStates(prevState.agentStates)
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self._copyHashes(prevState)
+        else:
+            self._foodHash, self._numFood, self._foodCacheOf = 0, 0, None
+            self._capsuleHash, self._capsuleHashOf = 0, None
         
         self._foodEaten = None
         self._foodAdded = None
@@ -422,15 +737,95 @@ class GameStateData:
         self.scoreChange = 0
     
     def deepCopy(self):
-        state = GameStateData(self)
+        state = self.shallowCopy()
         state.food = self.food.deepCopy()
         state.layout = self.layout.deepCopy()
+        state._copyHashes(self)
+        return state
+    
+    def shallowCopy(self):
+        """
+        Like deepCopy, but shares the layout and the food grid with this state
+        instead of duplicating them.  The game rules never modify either in
+        place (eating food replaces the grid, see removeFood), so the copy only
+        pays for the agent states and capsules it actually owns.  The food is
+        shared as a ReadOnlyGrid (see _frozenFood), so writing into the copy's
+        food raises instead of changing this state.
+        """
+        state = GameStateData(self)
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
         state._capsuleEaten = self._capsuleEaten
         return state
     
+    def _copyHashes(self, other):
+        "Takes over the food count and Zobrist hashes of other, whose food and capsules self has just copied"
+        self._foodHash = other.getFoodHash()
+        self._numFood = other.getNumFood()
+        self._foodCacheOf = self.food
+        self._capsuleHash = other.getCapsuleHash()
+        self._capsuleHashOf = tuple(self.capsules)
+    
+    def _updateFoodCache(self):
+        """
+        Recomputes the food count and hash unless they are known to match the
+        food: only a ReadOnlyGrid cannot have been written to in place since
+        they were computed, so any other food is counted and hashed again.
+        """
+        if self._foodCacheOf is not self.food or not isinstance(self.food, ReadOnlyGrid):
+            self._foodHash = ZobristKeys.forBoard(self.food.width, self.food.height).hashFood(self.food)
+            self._numFood = self.food.count()
+            self._foodCacheOf = self.food
+    
+    def getFoodHash(self):
+        """
+        The Zobrist hash of the food.  It is updated in O(1) by removeFood and
+        only recomputed if the food grid was replaced some other way or may
+        have been written to (see _updateFoodCache).
+        """
+        self._updateFoodCache()
+        return self._foodHash
+    
+    def getNumFood(self):
+        "The number of food pellets left, maintained by removeFood"
+        self._updateFoodCache()
+        return self._numFood
+    
+    def getCapsuleHash(self):
+        """
+        The Zobrist hash of the capsules, kept up to date by removeCapsule.  It
+        is recomputed if the capsules were changed some other way; there are
+        only a few of them, so comparing them with the ones hashed is cheap.
+        """
+        capsules = tuple(self.capsules)
+        if capsules != self._capsuleHashOf:
+            self._capsuleHash = ZobristKeys.forBoard(self.layout.width, self.layout.height).hashCapsules(capsules)
+            self._capsuleHashOf = capsules
+        return self._capsuleHash
+    
+    def removeFood(self, x, y):
+        """
+        Removes the food at (x,y) and updates the food count and hash in O(1).
+        Other states may share the current food grid, so the new grid is a
+        read-only copy that shares every column except column x with it.
+        """
+        if not self.food[x][y]:
+            return
+        self._updateFoodCache()
+        self.food = ReadOnlyGrid(self.food.withCell(x, y, False))
+        self._foodHash ^= ZobristKeys.forBoard(self.food.width, self.food.height).foodKey(x, y)
+        self._numFood -= 1
+        self._foodCacheOf = self.food
+    
+    def removeCapsule(self, position):
+        "Removes the capsule at position and updates the capsule hash in O(1)"
+        capsuleHash = self.getCapsuleHash()
+        self.capsules.remove(position)
+        x, y = position
+        self._capsuleHash = capsuleHash ^ ZobristKeys.forBoard(self.layout.width, self.layout.height).capsuleKey(x, y)
+        self._capsuleHashOf = tuple(self.capsules)
+    
     def copyAgentStates(self, agentStates):
         copiedStates = []
         for agentState in agentStates:
@@ -444,6 +839,9 @@ class GameStateData:
         if other == None:
             return False
         # TODO Check for type of other
+        # Hashes are cheap to compute, and states that hash differently can't be equal
+        if hash(self) != hash(other):
+            return False
         if not self.agentStates == other.agentStates:
             return False
         if not self.food == other.food:
@@ -457,15 +855,11 @@ class GameStateData:
     def __hash__(self):
         """
         Allows states to be keys of dictionaries.
+
+        Food and capsules contribute their incrementally maintained Zobrist
+        hashes, so hashing a state does not depend on the size of the board.
         """
-        for i, state in enumerate(self.agentStates):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                # hash(state)
-        return int((hash(tuple(self.agentStates)) + 13 * hash(self.food) + 113 * hash(tuple(self.capsules)) + 7 * hash(
-            self.score)) % 1048575)
+        return hash((hash(tuple(self.agentStates)), self.getFoodHash(), self.getCapsuleHash(), self.score))
     
     def __str__(self):
         width, height = self.layout.width, self.layout.height
@@ -529,6 +923,8 @@ class GameStateData:
         # self.capsules = []
         self.capsules = layout.capsules[:]
         self.layout = layout
+        self._foodCacheOf = None
+        self._capsuleHashOf = None
         self.score = 0
         self.scoreChange = 0
         
@@ -567,6 +963,7 @@ class Game:
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
         self.moveHistory = []
+        self.recorder = None
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
@@ -582,6 +979,7 @@ class Game:
     def _agentCrash(self, agentIndex, quiet = False):
         "Helper method for handling agent crashes"
         if not quiet:
+            import traceback
             traceback.print_exc()
         self.gameOver = True
         self.agentCrashed = True
@@ -682,7 +1080,7 @@ class Game:
                     observation = agent.observationFunction(self.state.deepCopy())
                 self.unmute()
             else:
-                observation = self.state.deepCopy()
+                observation = self.state.makeObservation(agentIndex)
             
             # Solicit an action
             action = None
@@ -747,6 +1145,8 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor(agentIndex, action)
+            if self.recorder is not None:
+                self.recorder.record(agentIndex, action, self.state)
             
             # Change the display
             self.display.update(self.state.data)
@@ -0,0 +1,242 @@
+# gameRecord.py
+# -------------
+# A compact, append-only binary format for recorded Pacman games.
+
+"""
+A game record is written while the game is played and read back by
+pacman.py --replay.  It holds only plain data, so loading one never
+unpickles anything.  The file starts with a header:
+
+  magic       6 bytes   b'PACREC'
+  version     1 byte
+  flags       1 byte    COMPRESSED (blocks are zlib streams), HAS_SEED
+  numAgents   1 byte    Pacman plus the ghosts that were playing
+  seed        8 bytes   the random seed the game started from (0 if none)
+  fingerprint 20 bytes  sha1 of the layout text
+  textLength  4 bytes   followed by the layout text itself (utf-8)
+
+followed by any number of blocks, each a 1 byte kind, a 4 byte length and
+a payload, zlib-compressed when the COMPRESSED flag is set.  A MOVES payload
+is one byte per move, (agentIndex << 3) | ACTIONS.index(action).  A KEYFRAME
+payload is a snapshot of the game state after a number of moves (see
+encodeKeyframe), written every keyframeInterval moves so that a replay can
+seek to any move without simulating the game from the start.
+
+Blocks are appended and flushed every blockSize moves, so a game that is
+cut short still leaves a readable record of every block written so far; a
+truncated last block is ignored.  All numbers are big-endian.
+"""
+
+import bisect
+import hashlib
+import struct
+import zlib
+
+from game import Directions
+
+MAGIC = b'PACREC'
+VERSION = 2
+COMPRESSED = 1
+HAS_SEED = 2
+MOVES = 0
+KEYFRAME = 1
+
+HEADER = struct.Struct('>6sBBBQ20sI')
+BLOCK_HEADER = struct.Struct('>BI')
+
+# A keyframe: the number of moves made, the score and whether the game was
+# won or lost, then per agent its position in half cells, direction and
+# scared timer, then the food and remaining capsules as bitmasks
+KEYFRAME_HEADER = struct.Struct('>IiBB')
+KEYFRAME_AGENT = struct.Struct('>HHBB')
+WIN = 1
+LOSE = 2
+
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+ACTION_CODES = dict([(action, code) for code, action in enumerate(ACTIONS)])
+MAX_AGENTS = 32
+
+
+def layoutFingerprint(layout):
+    "The sha1 digest identifying a layout by its text"
+    return hashlib.sha1('\n'.join(layout.layoutText).encode('utf-8')).digest()
+
+
+def _maskBytes(bits, numBits):
+    return bits.to_bytes((numBits + 7) // 8, 'big')
+
+
+def encodeKeyframe(moveIndex, data):
+    "Packs the GameStateData reached after moveIndex moves into a keyframe"
+    flags = 0
+    if data._win:
+        flags |= WIN
+    if data._lose:
+        flags |= LOSE
+    parts = [KEYFRAME_HEADER.pack(moveIndex, int(data.score), flags, len(data.agentStates))]
+    for agentState in data.agentStates:
+        x, y = agentState.configuration.getPosition()
+        parts.append(KEYFRAME_AGENT.pack(int(round(2 * x)), int(round(2 * y)),
+                                         ACTION_CODES[agentState.configuration.getDirection()],
+                                         agentState.scaredTimer))
+    food = data.food.toBitGrid()
+    parts.append(_maskBytes(food.bits, food.width * food.height))
+    capsules = 0
+    for i, capsule in enumerate(data.layout.capsules):
+        if capsule in data.capsules:
+            capsules |= 1 << i
+    parts.append(_maskBytes(capsules, len(data.layout.capsules)))
+    return b''.join(parts)
+
+
+def decodeKeyframe(payload, layout):
+    """
+    Unpacks a keyframe of a game on layout.  Returns the number of moves it
+    was taken after and the GameStateData at that point.
+    """
+    from game import GameStateData, Configuration, BitGrid
+    moveIndex, score, flags, numAgents = KEYFRAME_HEADER.unpack_from(payload)
+    data = GameStateData()
+    data.initialize(layout, numAgents - 1)
+    offset = KEYFRAME_HEADER.size
+    for agentState in data.agentStates:
+        x, y, direction, scaredTimer = KEYFRAME_AGENT.unpack_from(payload, offset)
+        offset += KEYFRAME_AGENT.size
+        agentState.configuration = Configuration((x / 2.0 if x & 1 else x // 2, y / 2.0 if y & 1 else y // 2),
+                                                 ACTIONS[direction])
+        agentState.scaredTimer = scaredTimer
+
+    numCells = layout.width * layout.height
+    length = (numCells + 7) // 8
+    food = BitGrid(layout.width, layout.height, bits = int.from_bytes(payload[offset:offset + length], 'big'))
+    data.food = food.toGrid()
+    offset += length
+    capsules = int.from_bytes(payload[offset:], 'big')
+    data.capsules = [capsule for i, capsule in enumerate(layout.capsules) if capsules & (1 << i)]
+
+    data.score = score
+    data._win = bool(flags & WIN)
+    data._lose = bool(flags & LOSE)
+    return moveIndex, data
+
+
+class GameRecorder:
+    """
+    Writes a game record move by move.  Game.run calls record with every move
+    and the state it led to when the recorder is set as game.recorder; close
+    writes what is left.
+    """
+
+    def __init__(self, fileName, layout, numAgents, seed = None, compress = True, blockSize = 256,
+                 keyframeInterval = 500):
+        if numAgents > MAX_AGENTS:
+            raise Exception('A game record holds at most %d agents' % MAX_AGENTS)
+        self.compress = compress
+        self.blockSize = blockSize
+        self.keyframeInterval = keyframeInterval
+        self.block = bytearray()
+        self.numMoves = 0
+
+        flags = 0
+        if compress:
+            flags |= COMPRESSED
+        if seed is not None:
+            flags |= HAS_SEED
+        text = '\n'.join(layout.layoutText).encode('utf-8')
+        self.file = open(fileName, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, flags, numAgents, seed or 0, layoutFingerprint(layout), len(text)))
+        self.file.write(text)
+        self.file.flush()
+
+    def record(self, agentIndex, action, state = None):
+        self.block.append((agentIndex << 3) | ACTION_CODES[action])
+        self.numMoves += 1
+        if state is not None and self.keyframeInterval and self.numMoves % self.keyframeInterval == 0:
+            self.writeBlock()
+            self.writePayload(KEYFRAME, encodeKeyframe(self.numMoves, state.data))
+        elif len(self.block) >= self.blockSize:
+            self.writeBlock()
+
+    def writeBlock(self):
+        if len(self.block) == 0:
+            return
+        self.writePayload(MOVES, bytes(self.block))
+        self.block = bytearray()
+
+    def writePayload(self, kind, payload):
+        if self.compress:
+            payload = zlib.compress(payload)
+        self.file.write(BLOCK_HEADER.pack(kind, len(payload)))
+        self.file.write(payload)
+        self.file.flush()
+
+    def close(self):
+        self.writeBlock()
+        self.file.close()
+
+
+class GameRecord:
+    """
+    A game record read back from a file: the layout, the number of agents,
+    the seed (None if it was not recorded), the list of (agentIndex, action)
+    moves and the keyframes as a sorted list of (moveIndex, payload).
+    """
+
+    def __init__(self, layout, numAgents, seed, actions, keyframes = None):
+        self.layout = layout
+        self.numAgents = numAgents
+        self.seed = seed
+        self.actions = actions
+        self.keyframes = keyframes or []
+
+    def getKeyframe(self, moveIndex):
+        """
+        The latest keyframe taken at or before moveIndex, as (moveIndex,
+        GameStateData), or None if there is none.
+        """
+        i = bisect.bisect_right([index for index, payload in self.keyframes], moveIndex)
+        if i == 0:
+            return None
+        return decodeKeyframe(self.keyframes[i - 1][1], self.layout)
+
+
+def readGameRecord(fileName):
+    "Loads the GameRecord stored in fileName"
+    from support import layout
+    f = open(fileName, 'rb')
+    try:
+        data = f.read()
+    finally:
+        f.close()
+
+    if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+        raise Exception('%s is not a recorded game' % fileName)
+    magic, version, flags, numAgents, seed, fingerprint, textLength = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise Exception('Unsupported game record version %d in %s' % (version, fileName))
+    offset = HEADER.size
+    text = data[offset:offset + textLength].decode('utf-8')
+    offset += textLength
+    recordedLayout = layout.Layout(text.split('\n'))
+    if layoutFingerprint(recordedLayout) != fingerprint:
+        raise Exception('The layout in %s does not match its fingerprint' % fileName)
+
+    actions = []
+    keyframes = []
+    while offset + BLOCK_HEADER.size <= len(data):
+        kind, length = BLOCK_HEADER.unpack_from(data, offset)
+        offset += BLOCK_HEADER.size
+        if offset + length > len(data):
+            break  # The game was cut short in the middle of this block
+        payload = data[offset:offset + length]
+        offset += length
+        if flags & COMPRESSED:
+            payload = zlib.decompress(payload)
+        if kind == MOVES:
+            actions.extend([(move >> 3, ACTIONS[move & 7]) for move in payload])
+        elif kind == KEYFRAME:
+            keyframes.append((KEYFRAME_HEADER.unpack_from(payload)[0], payload))
+
+    if not flags & HAS_SEED:
+        seed = None
+    return GameRecord(recordedLayout, numAgents, seed, actions, keyframes)
@@ -39,7 +39,7 @@ code to run a game.  This file is divided into three sections:
 To play your first game, type 'python pacman.py' from the command line.
 The keys are 'a', 's', 'd', and 'w' to move (or arrow keys).  Have fun!
 """
-import sys, types, time, random, os
+import sys, types, time, random
 
 sys.path.append('..')
 from game import GameStateData
@@ -70,21 +70,60 @@ class GameState:
 
     Note that in classic Pacman, Pacman is always agent 0.
     """
+    __slots__ = ('data',)
     
     ####################################################
     # Accessor methods: use these to access state data #
     ####################################################
     
-    # static variable keeps track of which states have had getLegalActions called
+    # static variables keep track of which states have been generated; this
+    # instrumentation is off unless turned on with setExploredTracking
+    EXPLORED_OFF = 'off'
+    EXPLORED_COUNT = 'count'
+    EXPLORED_SET = 'set'
+    exploredMode = EXPLORED_OFF
+    exploredLimit = None
+    exploredPerGame = True
     explored = set()
+    exploredCount = 0
+    
+    def setExploredTracking(mode, limit = None, perGame = True):
+        """
+        Chooses how generateSuccessor records explored states:
+          'off':   nothing is recorded (the default)
+          'count': only the number of generated successors is counted
+          'set':   the states themselves are kept in GameState.explored, up to
+                   limit states if limit is not None (the count keeps going)
+        With perGame, the record is cleared whenever a new game starts.
+        """
+        if mode not in (GameState.EXPLORED_OFF, GameState.EXPLORED_COUNT, GameState.EXPLORED_SET):
+            raise Exception('Unknown explored tracking mode: ' + str(mode))
+        GameState.exploredMode = mode
+        GameState.exploredLimit = limit
+        GameState.exploredPerGame = perGame
+        GameState.getAndResetExplored()
+    
+    setExploredTracking = staticmethod(setExploredTracking)
     
     def getAndResetExplored():
         tmp = GameState.explored.copy()
         GameState.explored = set()
+        GameState.exploredCount = 0
         return tmp
     
     getAndResetExplored = staticmethod(getAndResetExplored)
     
+    def _recordExplored(parent, child):
+        GameState.exploredCount += 1
+        if GameState.exploredMode == GameState.EXPLORED_SET:
+            limit = GameState.exploredLimit
+            if limit is None or len(GameState.explored) < limit:
+                GameState.explored.add(parent)
+            if limit is None or len(GameState.explored) < limit:
+                GameState.explored.add(child)
+    
+    _recordExplored = staticmethod(_recordExplored)
+    
     def getLegalActions(self, agentIndex = 0):
         """
         Returns the legal actions for the agent specified.
@@ -128,8 +167,8 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.exploredMode != GameState.EXPLORED_OFF:
+            GameState._recordExplored(self, state)
         return state
     
     def getLegalPacmanActions(self):
@@ -182,7 +221,7 @@ class GameState:
         return self.data.capsules
     
     def getNumFood(self):
-        return self.data.food.count()
+        return self.data.getNumFood()
     
     def getFood(self):
         """
@@ -239,6 +278,18 @@ class GameState:
         state.data = self.data.deepCopy()
         return state
     
+    def makeObservation(self, agentIndex):
+        """
+        Returns the copy of this state that agentIndex observes before it moves.
+        Unlike deepCopy it shares the layout, walls and food with this state;
+        anything a successor changes is copied at that point, so agents can
+        generate successors from it freely.  The food is a ReadOnlyGrid, so an
+        agent that wants to write into it has to copy it first.
+        """
+        state = GameState(self)
+        state.data = self.data.shallowCopy()
+        return state
+    
     def __eq__(self, other):
         """
         Allows two states to be compared.
@@ -284,6 +335,8 @@ class ClassicGameRules:
     
     def newGame(self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions = False):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
+        if GameState.exploredPerGame:
+            GameState.getAndResetExplored()
         initState = GameState()
         initState.initialize(layout, len(ghostAgents))
         game = Game(agents, display, self, catchExceptions = catchExceptions)
@@ -381,17 +434,15 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.removeFood(x, y)
             state.data._foodEaten = position
-            # TODO: cache numFood?
             numFood = state.getNumFood()
             if numFood == 0 and not state.data._lose:
                 state.data.scoreChange += 500
                 state.data._win = True
         # Eat capsule
         if position in state.getCapsules():
-            state.data.capsules.remove(position)
+            state.data.removeCapsule(position)
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
@@ -529,14 +580,14 @@ def readCommand(argv):
                       help = default('the LAYOUT_FILE from which to load the map layout'),
                       metavar = 'LAYOUT_FILE', default = 'mediumClassic')
     parser.add_option('-p', '--pacman', dest = 'pacman',
-                      help = default('the agent TYPE in the pacmanAgents module to use'),
+                      help = default('the agent TYPE (or module:TYPE) to use for Pacman'),
                       metavar = 'TYPE', default = 'KeyboardAgent')
     parser.add_option('-t', '--textGraphics', action = 'store_true', dest = 'textGraphics',
                       help = 'Display output as text only', default = False)
     parser.add_option('-q', '--quietTextGraphics', action = 'store_true', dest = 'quietGraphics',
                       help = 'Generate minimal output and no graphics', default = False)
     parser.add_option('-g', '--ghosts', dest = 'ghost',
-                      help = default('the ghost agent TYPE in the ghostAgents module to use'),
+                      help = default('the ghost agent TYPE (or module:TYPE) to use'),
                       metavar = 'TYPE', default = 'RandomGhost')
     parser.add_option('-k', '--numghosts', type = 'int', dest = 'numGhosts',
                       help = default('The maximum number of ghosts to use'), default = 4)
@@ -547,7 +598,10 @@ def readCommand(argv):
     parser.add_option('-r', '--recordActions', action = 'store_true', dest = 'record',
                       help = 'Writes game histories to a file (named by the time they were played)', default = False)
     parser.add_option('--replay', dest = 'gameToReplay',
-                      help = 'A recorded game file (pickle) to replay', default = None)
+                      help = 'A recorded game file to replay', default = None)
+    parser.add_option('--replayFrom', dest = 'replayFrom', type = 'int', metavar = 'MOVE',
+                      help = default('Skip ahead to this move of the replay without showing the moves before it'),
+                      default = 0)
     parser.add_option('-a', '--agentArgs', dest = 'agentArgs',
                       help = 'Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest = 'numTraining', type = 'int',
@@ -559,6 +613,18 @@ def readCommand(argv):
     parser.add_option('--timeout', dest = 'timeout', type = 'int',
                       help = default('Maximum length of time an agent can spend computing in a single game'),
                       default = 30)
+    parser.add_option('--trackExplored', dest = 'trackExplored', type = 'choice',
+                      choices = [GameState.EXPLORED_OFF, GameState.EXPLORED_COUNT, GameState.EXPLORED_SET],
+                      help = default('Record generated states: off, count them, or keep them in a set'),
+                      default = GameState.EXPLORED_OFF)
+    parser.add_option('--exploredLimit', dest = 'exploredLimit', type = 'int',
+                      help = 'Maximum number of states kept when tracking explored states in a set', default = None)
+    parser.add_option('--exploredAcrossGames', action = 'store_false', dest = 'exploredPerGame',
+                      help = 'Keep recording explored states across games instead of per game', default = True)
+    parser.add_option('--workers', dest = 'workers', type = 'int',
+                      help = 'Play the games headless on a pool of this many processes', default = None)
+    parser.add_option('--seed', dest = 'baseSeed', type = 'int',
+                      help = 'The base seed the per-game seeds of a --workers run are derived from', default = None)
     
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -569,12 +635,18 @@ def readCommand(argv):
     if options.fixRandomSeed:
         random.seed('cs188')
     
+    # Choose how explored states are tracked
+    GameState.setExploredTracking(options.trackExplored, options.exploredLimit, options.exploredPerGame)
+    
     # Choose a layout
     args['layout'] = layout.getLayout(options.layout)
     if args['layout'] is None:
         raise Exception("The layout " + options.layout + " cannot be found")
     
     # Choose a Pacman agent
+    if options.workers is not None:
+        # Worker processes have no display of their own
+        options.quietGraphics = True
     noKeyboard = options.gameToReplay is None and (options.textGraphics or options.quietGraphics)
     pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
@@ -609,58 +681,71 @@ def readCommand(argv):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    if options.workers is not None:
+        args['workers'] = options.workers
+        args['baseSeed'] = options.baseSeed
     
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
-        print()
-        'Replaying recorded game %s.' % options.gameToReplay
-        import pickle
-        f = open(options.gameToReplay)
-        try:
-            recorded = pickle.load(f)
-        finally:
-            f.close()
-        recorded['display'] = args['display']
-        replayGame(**recorded)
+        import gameRecord
+        print('Replaying recorded game %s.' % options.gameToReplay)
+        recorded = gameRecord.readGameRecord(options.gameToReplay)
+        startState = seekRecordedGame(recorded, options.replayFrom)
+        replayGame(recorded.layout, recorded.actions, args['display'], recorded.numAgents - 1,
+                   startState, options.replayFrom)
         sys.exit(0)
     
     return args
 
 
 def loadAgent(pacman, nographics):
-    # Looks through all pythonPath Directories for the right module,
-    pythonPathStr = os.path.expandvars("$PYTHONPATH")
-    if pythonPathStr.find(';') == -1:
-        pythonPathDirs = pythonPathStr.split(':')
+    """
+    Returns the agent class named pacman, found through the agent registry
+    (see agentRegistry) so that only the module defining it is imported.
+    pacman may also be given explicitly as 'module:Class'.
+    """
+    import agentRegistry
+    return agentRegistry.REGISTRY.load(pacman, nographics)
+
+
+def seekRecordedGame(recorded, moveIndex):
+    """
+    Returns the GameState of a recorded game (see gameRecord) after its first
+    moveIndex moves.  It starts from the latest keyframe at or before
+    moveIndex and fast-forwards through the remaining moves without a display.
+    """
+    if moveIndex < 0 or moveIndex > len(recorded.actions):
+        raise Exception('The recorded game has no move %d (it has %d moves)' % (moveIndex, len(recorded.actions)))
+    state = GameState()
+    keyframe = recorded.getKeyframe(moveIndex)
+    if keyframe is None:
+        start = 0
+        state.initialize(recorded.layout, recorded.numAgents - 1)
     else:
-        pythonPathDirs = pythonPathStr.split(';')
-    pythonPathDirs.append('.')
-    
-    for moduleDir in pythonPathDirs:
-        if not os.path.isdir(moduleDir):
-            continue
-        moduleNames = [f for f in os.listdir(moduleDir) if f.endswith('gents.py')]
-        for modulename in moduleNames:
-            try:
-                module = __import__(modulename[:-3])
-            except ImportError:
-                continue
-            if pacman in dir(module):
-                if nographics and modulename == 'keyboardAgents.py':
-                    raise Exception('Using the keyboard requires graphics (not text display)')
-                return getattr(module, pacman)
-    raise Exception('The agent ' + pacman + ' is not specified in any *Agents.py.')
-
-
-def replayGame(layout, actions, display):
+        start, state.data = keyframe
+    for action in recorded.actions[start:moveIndex]:
+        state = state.generateSuccessor(*action)
+    return state
+
+
+def replayGame(layout, actions, display, numGhosts = None, startState = None, startMove = 0):
+    """
+    Shows a recorded list of (agentIndex, action) moves on display.  With
+    startState, the replay begins at that state, which must be the one
+    reached after the first startMove moves (see seekRecordedGame).
+    """
     import pacmanAgents, ghostAgents
+    if numGhosts is None:
+        numGhosts = layout.getNumGhosts()
     rules = ClassicGameRules()
-    agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i + 1) for i in range(layout.getNumGhosts())]
+    agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i + 1) for i in range(numGhosts)]
     game = rules.newGame(layout, agents[0], agents[1:], display)
     state = game.state
+    if startState is not None:
+        state = startState
     display.initialize(state.data)
     
-    for action in actions:
+    for action in actions[startMove:]:
         # Execute the action
         state = state.generateSuccessor(*action)
         # Change the display
@@ -671,7 +756,17 @@ def replayGame(layout, actions, display):
     display.finish()
 
 
-def runGames(layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions = False, timeout = 30):
+def runGames(layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions = False, timeout = 30,
+             workers = None, baseSeed = None):
+    """
+    Plays numGames games and prints a summary of the ones that were not
+    training games.  With workers, the games are played headless on a pool of
+    that many processes instead (see runParallelGames).
+    """
+    if workers is not None:
+        return runParallelGames(layout, pacman, ghosts, numGames, record, numTraining, catchExceptions, timeout,
+                                workers, baseSeed)
+    
     import __main__
     __main__.__dict__['_display'] = display
     
@@ -689,34 +784,148 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining = 0,
             gameDisplay = display
             rules.quiet = False
         game = rules.newGame(layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
-        game.run()
+        if record:
+            # Start from a known seed so that the record can name it
+            seed = random.getrandbits(64)
+            random.seed(seed)
+            recordGame(layout, game, i, seed)
+        try:
+            game.run()
+        finally:
+            if record:
+                game.recorder.close()
         if not beQuiet:
             games.append(game)
-        
-        if record:
-            import time, pickle
-            fname = ('recorded-game-%d' % (i + 1)) + '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            pickle.dump(components, f)
-            f.close()
+            if GameState.exploredMode != GameState.EXPLORED_OFF:
+                print(('Successors generated: %d (%d states kept)' % (GameState.exploredCount, len(GameState.explored))))
     
     if (numGames - numTraining) > 0:
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True) / float(len(wins))
-        print()
-        'Average Score:', sum(scores) / float(len(scores))
-        print()
-        'Scores:       ', ', '.join([str(score) for score in scores])
-        print()
-        'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
-        print()
-        'Record:       ', ', '.join([['Loss', 'Win'][int(w)] for w in wins])
+        printSummary([GameResult(i, game) for i, game in enumerate(games)])
     
     return games
 
 
+def recordGame(layout, game, index, seed = None):
+    """
+    Makes game write its moves to a file named after index and the time as it
+    is played (see gameRecord).  The caller closes game.recorder afterwards.
+    """
+    import gameRecord
+    fname = ('recorded-game-%d' % (index + 1)) + '-'.join([str(t) for t in time.localtime()[1:6]])
+    game.recorder = gameRecord.GameRecorder(fname, layout, len(game.agents), seed)
+
+
+def printSummary(results):
+    "Prints the Average Score / Win Rate summary for a list of GameResults"
+    scores = [result.score for result in results]
+    wins = [result.win for result in results]
+    winRate = wins.count(True) / float(len(wins))
+    print('Average Score:', sum(scores) / float(len(scores)))
+    print('Scores:       ', ', '.join([str(score) for score in scores]))
+    print('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate))
+    print('Record:       ', ', '.join([['Loss', 'Win'][int(w)] for w in wins]))
+
+
+class GameResult:
+    """
+    What is left of a finished game once it has been sent back from a worker
+    process: the score, whether Pacman won, the number of moves made, the
+    wall time of the game, the time each agent spent computing (only measured
+    with catchExceptions) and, when explored states are tracked, the number
+    of successors generated.
+    """
+    
+    def __init__(self, index, game, seed = None, elapsed = 0.0, successors = None):
+        self.index = index
+        self.seed = seed
+        self.elapsed = elapsed
+        self.score = game.state.getScore()
+        self.win = game.state.isWin()
+        self.moves = len(game.moveHistory)
+        self.agentTimes = list(game.totalAgentTimes)
+        self.successors = successors
+
+
+def _setUpWorker(setup, exploredTracking):
+    "The setup of a worker process of runParallelGames (see util.workerPool)"
+    GameState.setExploredTracking(*exploredTracking)
+    return setup
+
+
+def _playSeededGame(index):
+    "Plays game number index in a worker process and returns its GameResult"
+    import textDisplay
+    layout, pacman, ghosts, record, catchExceptions, timeout, baseSeed = util.workerSetup()
+    seed = util.derivedSeed(baseSeed, index)
+    random.seed(seed)
+    rules = ClassicGameRules(timeout)
+    game = rules.newGame(layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions)
+    if record:
+        recordGame(layout, game, index, seed)
+    start = time.time()
+    try:
+        game.run()
+    finally:
+        if record:
+            game.recorder.close()
+    elapsed = time.time() - start
+    successors = None
+    if GameState.exploredMode != GameState.EXPLORED_OFF:
+        successors = GameState.exploredCount
+    return GameResult(index, game, seed, elapsed, successors)
+
+
+def runParallelGames(layout, pacman, ghosts, numGames, record, numTraining = 0, catchExceptions = False, timeout = 30,
+                     workers = 1, baseSeed = None):
+    """
+    Plays numGames headless games on a pool of worker processes and prints the
+    same summary as runGames, in game order.  Every game is seeded with
+    util.derivedSeed(baseSeed, index) before it starts, so a run can be
+    reproduced with the same base seed and any number of workers.  Each worker
+    plays with its own copy of the agents, so agents that learn across games
+    should be run without workers; for the same reason training games are
+    refused.
+    
+    Results are printed as they come back and returned as GameResults sorted
+    by game index.
+    """
+    if numTraining > 0:
+        raise Exception('Training games cannot be split across worker processes')
+    if workers < 1:
+        raise Exception('The number of workers must be at least 1')
+    if baseSeed is None:
+        baseSeed = random.getrandbits(32)
+    print('Playing %d games on %d workers (base seed %d)' % (numGames, workers, baseSeed))
+    
+    setup = (layout, pacman, ghosts, record, catchExceptions, timeout, baseSeed)
+    exploredTracking = (GameState.exploredMode, GameState.exploredLimit, True)
+    chunkSize = max(1, min(16, numGames // (workers * 4)))
+    results = []
+    pool = util.workerPool(workers, _setUpWorker, setup, exploredTracking)
+    try:
+        for result in pool.imap_unordered(_playSeededGame, range(numGames), chunkSize):
+            results.append(result)
+            print('Game %d (seed %d): %s Score: %d, %d moves' % (result.index + 1, result.seed,
+                                                                 ['Loss.', 'Win!'][int(result.win)],
+                                                                 result.score, result.moves))
+    finally:
+        pool.terminate()
+        pool.join()
+    results.sort(key = lambda result: result.index)
+    
+    if len(results) > 0:
+        printSummary(results)
+        numMoves = sum([result.moves for result in results])
+        agentTimes = [sum(times) for times in zip(*[result.agentTimes for result in results])]
+        print('Average Moves:', numMoves / float(len(results)))
+        print('Average Time:  %.3fs per game' % (sum([result.elapsed for result in results]) / len(results)))
+        if catchExceptions:
+            print('Agent Time:   ', ', '.join(['%.2fs' % t for t in agentTimes]))
+        if GameState.exploredMode != GameState.EXPLORED_OFF:
+            print('Successors generated: %d' % sum([result.successors for result in results]))
+    return results
+
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
@@ -728,6 +937,9 @@ if __name__ == '__main__':
 
     > python pacman.py --help
     """
+    # Agents and displays that import pacman get this module instead of a
+    # second copy of it
+    sys.modules.setdefault('pacman', sys.modules['__main__'])
     args = readCommand(sys.argv[1:])  # Get game components based on input
     runGames(**args)
     
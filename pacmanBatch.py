@@ -0,0 +1,265 @@
+# pacmanBatch.py
+# --------------
+# A batched version of the classic Pacman rules that steps many games of the
+# same layout at once, for policy evaluation and training.
+
+"""
+BatchPacmanEnv holds N games of one layout as NumPy arrays and advances all
+of them by a full round (Pacman, then each ghost in turn) per call to step.
+It follows PacmanRules and GhostRules from pacman.py move for move:
+
+  - Pacman may stop, and an illegal Pacman move leaves him where he is.
+  - Ghosts cannot stop, only turn around at dead ends, move at half speed
+    while scared and snap back onto the grid when their timer runs out.
+  - Food is worth 10, clearing the board 500, eating a scared ghost 200 and
+    being caught costs 500 per ghost; every Pacman move costs TIME_PENALTY.
+  - A game ends as soon as it is won or lost, so the agents after the one
+    that ended it do not move in that round.
+
+Positions are kept in half-cell units (twice the board coordinates), which
+keeps the half-speed moves of scared ghosts in integers.  Actions are coded
+as indices into ACTIONS.
+
+USAGE:
+  env = BatchPacmanEnv()
+  obs = env.reset(layout.getLayout('mediumClassic'), 1000)
+  while not env.done.all():
+      obs, reward, done = env.step(policy(obs, env.getLegalActions(0)))
+
+NumPy is only needed by this module.
+"""
+
+import numpy
+
+from game import Directions
+from pacman import SCARED_TIME, COLLISION_TOLERANCE, TIME_PENALTY
+
+NORTH, SOUTH, EAST, WEST, STOP = 0, 1, 2, 3, 4
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+ACTION_CODES = dict([(action, code) for code, action in enumerate(ACTIONS)])
+
+# Moves in half-cell units, and the direction each action reverses
+VECTORS = numpy.array([(0, 2), (0, -2), (2, 0), (-2, 0), (0, 0)], dtype = numpy.int32)
+REVERSE = numpy.array([SOUTH, NORTH, WEST, EAST, STOP], dtype = numpy.int8)
+
+FOOD_SCORE = 10
+WIN_SCORE = 500
+GHOST_SCORE = 200
+DEATH_SCORE = -500
+
+
+def actionCodes(actions):
+    "Converts a sequence of direction strings (or codes) to an array of codes"
+    if isinstance(actions, numpy.ndarray) and actions.dtype.kind in 'iu':
+        return actions
+    return numpy.array([ACTION_CODES.get(action, action) for action in actions], dtype = numpy.int8)
+
+
+class BatchPacmanEnv:
+    """
+    N games of one layout stepped in lockstep.  The state of game i is
+
+      positions[i]     (numAgents, 2) agent positions in half-cell units
+      directions[i]    (numAgents,)   the direction each agent last moved in
+      food[i]          (width, height) mask of the remaining food
+      capsules[i]      (numCapsules,) mask of the remaining layout.capsules
+      scaredTimers[i]  (numAgents,)   always 0 for Pacman
+      scores[i], done[i], won[i], lost[i]
+
+    Ghosts are played by RandomGhost unless step is given their actions.
+    """
+
+    def __init__(self, seed = None):
+        self.random = numpy.random.default_rng(seed)
+        self.layout = None
+
+    def reset(self, layout, n, numGhosts = None):
+        """
+        Starts n fresh games of layout with at most numGhosts ghosts (all of
+        the layout's ghosts by default) and returns their observations.
+        """
+        if numGhosts is None:
+            numGhosts = layout.getNumGhosts()
+        self.layout = layout
+        self.n = n
+
+        # Padding the walls by a cell spares the bounds checks on neighbours
+        walls = numpy.ones((layout.width + 2, layout.height + 2), dtype = bool)
+        walls[1:-1, 1:-1] = numpy.array(layout.walls.data, dtype = bool)
+        self.walls = walls
+
+        starts = []
+        ghosts = 0
+        for isPacman, pos in layout.agentPositions:
+            if not isPacman:
+                if ghosts == numGhosts:
+                    continue
+                ghosts += 1
+            starts.append(pos)
+        self.numAgents = len(starts)
+        self.starts = 2 * numpy.array(starts, dtype = numpy.int32)
+        self.capsulePositions = 2 * numpy.array(layout.capsules, dtype = numpy.int32).reshape(-1, 2)
+
+        self.positions = numpy.repeat(self.starts[numpy.newaxis], n, axis = 0)
+        self.directions = numpy.full((n, self.numAgents), STOP, dtype = numpy.int8)
+        self.food = numpy.repeat(numpy.array(layout.food.data, dtype = bool)[numpy.newaxis], n, axis = 0)
+        self.numFood = numpy.full(n, layout.food.count(), dtype = numpy.int32)
+        self.capsules = numpy.ones((n, len(self.capsulePositions)), dtype = bool)
+        self.scaredTimers = numpy.zeros((n, self.numAgents), dtype = numpy.int32)
+        self.scores = numpy.zeros(n, dtype = numpy.int32)
+        self.done = numpy.zeros(n, dtype = bool)
+        self.won = numpy.zeros(n, dtype = bool)
+        self.lost = numpy.zeros(n, dtype = bool)
+        return self.getObservation()
+
+    def restart(self, games):
+        "Puts the games selected by games (a mask or indices) back at the start"
+        self.positions[games] = self.starts
+        self.directions[games] = STOP
+        self.food[games] = numpy.array(self.layout.food.data, dtype = bool)
+        self.numFood[games] = self.layout.food.count()
+        self.capsules[games] = True
+        self.scaredTimers[games] = 0
+        self.scores[games] = 0
+        self.done[games] = False
+        self.won[games] = False
+        self.lost[games] = False
+
+    def getObservation(self):
+        "A copy of the arrays describing every game"
+        return {'positions': self.positions / 2.0,
+                'directions': self.directions.copy(),
+                'food': self.food.copy(),
+                'capsules': self.capsules.copy(),
+                'scaredTimers': self.scaredTimers[:, 1:].copy(),
+                'scores': self.scores.copy()}
+
+    def getLegalActions(self, agentIndex = 0):
+        """
+        An (n, 5) mask of the actions agentIndex may take in each game, indexed
+        like ACTIONS (see Actions.getPossibleActions and
+        GhostRules.getLegalActions).
+        """
+        pos = self.positions[:, agentIndex]
+        direction = self.directions[:, agentIndex]
+        x, y = pos[:, 0] // 2 + 1, pos[:, 1] // 2 + 1
+        legal = numpy.zeros((self.n, len(ACTIONS)), dtype = bool)
+        legal[:, NORTH] = ~self.walls[x, y + 1]
+        legal[:, SOUTH] = ~self.walls[x, y - 1]
+        legal[:, EAST] = ~self.walls[x + 1, y]
+        legal[:, WEST] = ~self.walls[x - 1, y]
+        legal[:, STOP] = True
+
+        # Between cells an agent can only keep going
+        between = ((pos[:, 0] | pos[:, 1]) & 1).astype(bool)
+        legal[between] = False
+        legal[between, direction[between]] = True
+
+        if agentIndex > 0:
+            legal[:, STOP] = False
+            rows = numpy.arange(self.n)
+            reverse = REVERSE[direction]
+            canTurn = legal[rows, reverse] & (legal.sum(axis = 1) > 1)
+            legal[rows[canTurn], reverse[canTurn]] = False
+        return legal
+
+    def step(self, actions, ghostActions = None):
+        """
+        Plays one round in every unfinished game: Pacman takes actions[i], then
+        each ghost moves, randomly or as given by ghostActions (an (n,
+        numGhosts) array).  Returns (observation, reward, done), where reward
+        is the change in score over the round.
+        """
+        actions = actionCodes(actions)
+        if ghostActions is not None:
+            ghostActions = numpy.array([actionCodes(row) for row in ghostActions]).reshape(self.n, -1)
+        before = self.scores.copy()
+
+        self._movePacman(actions)
+        for ghostIndex in range(1, self.numAgents):
+            if ghostActions is None:
+                self._moveGhost(ghostIndex, None)
+            else:
+                self._moveGhost(ghostIndex, ghostActions[:, ghostIndex - 1])
+        return self.getObservation(), self.scores - before, self.done.copy()
+
+    def _movePacman(self, actions):
+        "PacmanRules.applyAction, the time penalty and checkDeath for Pacman"
+        active = numpy.flatnonzero(~self.done)
+        legal = self.getLegalActions(0)[active, actions[active]]
+        moving = active[legal]
+        self.positions[moving, 0] += VECTORS[actions[moving]]
+        turning = moving[actions[moving] != STOP]
+        self.directions[turning, 0] = actions[turning]
+
+        # Eat food
+        x, y = self.positions[moving, 0, 0] // 2, self.positions[moving, 0, 1] // 2
+        eats = self.food[moving, x, y]
+        eating = moving[eats]
+        self.food[eating, x[eats], y[eats]] = False
+        self.numFood[eating] -= 1
+        self.scores[eating] += FOOD_SCORE
+        cleared = eating[self.numFood[eating] == 0]
+        self.scores[cleared] += WIN_SCORE
+        self.won[cleared] = True
+
+        # Eat capsules, which scares every ghost
+        if len(self.capsulePositions) > 0:
+            atCapsule = (self.positions[moving, 0, numpy.newaxis] == self.capsulePositions).all(axis = 2)
+            atCapsule &= self.capsules[moving]
+            capsuleGames, capsuleIndices = numpy.nonzero(atCapsule)
+            self.capsules[moving[capsuleGames], capsuleIndices] = False
+            self.scaredTimers[moving[capsuleGames], 1:] = SCARED_TIME
+
+        self.scores[active] -= TIME_PENALTY
+        for ghostIndex in range(1, self.numAgents):
+            self._checkDeath(active, ghostIndex)
+        self._finish(active)
+
+    def _moveGhost(self, ghostIndex, actions):
+        "GhostRules.applyAction, decrementTimer and checkDeath for one ghost"
+        active = numpy.flatnonzero(~self.done)
+        legal = self.getLegalActions(ghostIndex)[active]
+        if actions is None:
+            # RandomGhost: a uniform choice among the legal actions
+            counts = legal.sum(axis = 1)
+            picks = (self.random.random(len(active)) * counts).astype(numpy.int64)
+            actions = numpy.argmax(legal.cumsum(axis = 1) > picks[:, numpy.newaxis], axis = 1).astype(numpy.int8)
+        else:
+            actions = actions[active]
+            if not legal[numpy.arange(len(active)), actions].all():
+                raise Exception('Illegal ghost action')
+
+        scared = self.scaredTimers[active, ghostIndex] > 0
+        vectors = VECTORS[actions]
+        vectors[scared] //= 2
+        self.positions[active, ghostIndex] += vectors
+        self.directions[active, ghostIndex] = actions
+
+        # Time passes: a ghost whose fright ends snaps back onto the grid
+        timers = self.scaredTimers[active, ghostIndex]
+        snapping = active[timers == 1]
+        self.positions[snapping, ghostIndex] += self.positions[snapping, ghostIndex] & 1
+        self.scaredTimers[active, ghostIndex] = numpy.maximum(0, timers - 1)
+
+        self._checkDeath(active, ghostIndex)
+        self._finish(active)
+
+    def _checkDeath(self, games, ghostIndex):
+        "GhostRules.checkDeath and collide between Pacman and one ghost"
+        distance = numpy.abs(self.positions[games, ghostIndex] - self.positions[games, 0]).sum(axis = 1)
+        colliding = games[distance <= 2 * COLLISION_TOLERANCE]
+        scared = self.scaredTimers[colliding, ghostIndex] > 0
+
+        eaten = colliding[scared]
+        self.scores[eaten] += GHOST_SCORE
+        self.positions[eaten, ghostIndex] = self.starts[ghostIndex]
+        self.directions[eaten, ghostIndex] = STOP
+        self.scaredTimers[eaten, ghostIndex] = 0
+
+        caught = colliding[~scared & ~self.won[colliding]]
+        self.scores[caught] += DEATH_SCORE
+        self.lost[caught] = True
+
+    def _finish(self, games):
+        self.done[games] = self.won[games] | self.lost[games]
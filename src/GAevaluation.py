@@ -0,0 +1,245 @@
+"""
+Vectorized fitness evaluation for the genetic algorithm search (GAsearch.py).
+
+The population is encoded as a 2-D int8 array with one row of genes (the
+direction codes of GAsearch.ACTIONS) per chromosome, padded with PAD.
+PopulationEvaluator walks every row through a transition table of the maze
+at once, one gene per step, and computes the cost, wall penalty and
+distances that Chromosome.calculate_fitness uses for the whole population
+with array operations.
+
+ParallelPopulationEvaluator splits each generation into batches that are
+evaluated on a pool of worker processes.  The maze tables are sent to every
+worker once, when the pool starts; after that only the encoded batches go
+out and their evaluations come back.
+
+NumPy is only needed by this module; search.genAlgSearch falls back to
+evaluating one chromosome at a time without it.
+"""
+import random
+
+import numpy
+
+from game import Directions
+from GAsearch import ACTIONS, ACTION_CODES, MOVE_CODES
+import searchAgents
+import util
+
+MOVES = numpy.array(MOVE_CODES, dtype = numpy.int8)
+PAD = -1
+BATCH_SIZE = 32
+
+
+def encodePopulation(population):
+    "The genes of a population as an (n, longest) int8 array"
+    longest = max([len(chromosome.genes) for chromosome in population])
+    codes = numpy.full((len(population), longest), PAD, dtype = numpy.int8)
+    for i, chromosome in enumerate(population):
+        codes[i, :len(chromosome.genes)] = numpy.frombuffer(chromosome.genes, dtype = numpy.int8)
+    return codes
+
+
+def decodeGenes(row, growth = PAD):
+    "The genes in one row of an encoded population, followed by growth unless it is PAD"
+    genes = row[row != PAD].tobytes()
+    if growth != PAD:
+        genes += bytes((int(growth),))
+    return genes
+
+
+class Evaluation:
+    """
+    The outcome of walking every chromosome of a population: per chromosome
+    the cost of the moves made, the number of moves into walls (penalty), the
+    maze distances from where it ended to the start and to the goal, whether
+    it reached the goal and its fitness; and per gene whether it was blocked.
+    """
+
+    def __init__(self, cost, penalty, distStart, distGoal, reached, blocked, score):
+        self.cost = cost
+        self.penalty = penalty
+        self.distStart = distStart
+        self.distGoal = distGoal
+        self.reached = reached
+        self.blocked = blocked
+        self.fitness = distStart + score - cost + distGoal - penalty
+
+
+def joinEvaluations(evaluations, score):
+    "One Evaluation for the rows of several, in order"
+    length = max([evaluation.blocked.shape[1] for evaluation in evaluations])
+    blocked = numpy.zeros((sum([len(evaluation.cost) for evaluation in evaluations]), length), dtype = bool)
+    row = 0
+    for evaluation in evaluations:
+        rows, columns = evaluation.blocked.shape
+        blocked[row:row + rows, :columns] = evaluation.blocked
+        row += rows
+    fields = [numpy.concatenate([getattr(evaluation, name) for evaluation in evaluations])
+              for name in ['cost', 'penalty', 'distStart', 'distGoal', 'reached']]
+    return Evaluation(*(fields + [blocked, score]))
+
+
+class PopulationEvaluator:
+    """
+    Evaluates whole populations for a PositionSearchProblem.  The maze is
+    turned into arrays once: a transition table from each open cell and
+    direction code to the next open cell (-1 where the move is blocked, which
+    is always the case for STOP), the cost of stepping into each cell, and
+    the maze distance from every cell to the start and to the goal.
+
+    Only those arrays are pickled, so an evaluator can be handed to another
+    process without the problem it was built from.
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.score = problem.gameState.getScore()
+        layout = problem.gameState.data.layout
+        cells = numpy.array(layout.getOpenCells(), dtype = numpy.int32).reshape(-1, 2)
+        numCells = len(cells)
+        neighbors = numpy.array(layout.getNeighbors(), dtype = numpy.int32).reshape(numCells, 4)
+        self.transitions = numpy.full((numCells, len(ACTIONS)), -1, dtype = numpy.int32)
+        for code, direction in enumerate([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]):
+            self.transitions[:, ACTION_CODES[direction]] = neighbors[:, code]
+        cells = [tuple(cell) for cell in cells.tolist()]
+        cellIndex = dict([(cell, i) for i, cell in enumerate(cells)])
+        self.start = cellIndex[problem.getStartState()]
+        self.goal = cellIndex[problem.goal]
+        self.stepCosts = numpy.array([problem.costFn(cell) for cell in cells], dtype = numpy.float64)
+
+        distances = searchAgents.getMazeDistances(problem.walls, searchAgents.MAZE_DISTANCE_CACHE_DIR)
+        matrix = numpy.frombuffer(distances.matrix, dtype = numpy.dtype(distances.typecode))
+        matrix = matrix.reshape(len(distances.cells), len(distances.cells))
+        order = [distances.cellIndex[cell] for cell in cells]
+        self.startDistances = self._distancesTo(matrix, distances, distances.cellIndex[problem.getStartState()], order)
+        self.goalDistances = self._distancesTo(matrix, distances, distances.cellIndex[problem.goal], order)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['problem'] = None
+        return state
+
+    def _distancesTo(self, matrix, distances, target, order):
+        # Unreachable cells count as distance 0, as in searchAgents.mazeDistance
+        row = matrix[target, order].astype(numpy.int64)
+        row[row == distances.unreachable] = 0
+        return row
+
+    def evaluate(self, codes):
+        """
+        Walks every row of codes from the start state in lockstep.  A blocked
+        move (into a wall, or STOP) leaves the chromosome where it is and adds
+        one to its penalty; PAD genes do nothing, and a chromosome stops moving
+        once it reaches the goal.  Returns an Evaluation.
+        """
+        numChromosomes, length = codes.shape
+        position = numpy.full(numChromosomes, self.start, dtype = numpy.int32)
+        cost = numpy.zeros(numChromosomes, dtype = numpy.float64)
+        penalty = numpy.zeros(numChromosomes, dtype = numpy.int64)
+        reached = position == self.goal
+        blocked = numpy.zeros(codes.shape, dtype = bool)
+        for gene in range(length):
+            move = codes[:, gene]
+            active = (move != PAD) & ~reached
+            following = self.transitions[position, numpy.maximum(move, 0)]
+            moving = active & (following >= 0)
+            blocked[:, gene] = active & (following < 0)
+            position = numpy.where(moving, following, position)
+            cost[moving] += self.stepCosts[position[moving]]
+            reached |= position == self.goal
+        penalty += blocked.sum(axis = 1)
+        return Evaluation(cost, penalty, self.startDistances[position], self.goalDistances[position], reached,
+                          blocked, self.score)
+
+    def evaluateAndRepair(self, codes, generator):
+        """
+        Evaluates codes, then, as genAlgSearch does, replaces every gene that
+        ran into a wall with a random move drawn from generator.  Returns the
+        Evaluation and, per row, the random move that a chromosome which
+        missed the goal grows by (PAD for the ones that reached it).
+        """
+        evaluation = self.evaluate(codes)
+        codes[evaluation.blocked] = MOVES[generator.integers(len(MOVES), size = int(evaluation.blocked.sum()))]
+        growth = MOVES[generator.integers(len(MOVES), size = len(codes))]
+        growth[evaluation.reached] = PAD
+        return evaluation, growth
+
+    def evaluatePopulation(self, population, fresh = False):
+        """
+        Evaluates a list of Chromosomes and fills in their cost, distances and
+        score, and adds the moves into walls to their penalty, like genAlgSearch
+        does one at a time.  As there, genes that ran into a wall are replaced
+        by a random move and every chromosome that missed the goal grows by one
+        random move.  With fresh, the penalty is set to the moves into walls
+        instead, for populations whose chromosomes were evaluated before.
+        Returns the Evaluation.
+        """
+        codes = encodePopulation(population)
+        evaluation, growth = self.evaluateAndRepair(codes, numpy.random.default_rng(random.getrandbits(64)))
+        self.update(population, codes, evaluation, growth, fresh)
+        return evaluation
+
+    def update(self, population, codes, evaluation, growth, fresh = False):
+        "Writes the repaired codes and the evaluation back into the Chromosomes"
+        for i, chromosome in enumerate(population):
+            chromosome.genes = decodeGenes(codes[i], growth[i])
+            chromosome.cost = float(evaluation.cost[i])
+            if fresh:
+                chromosome.penalty = 0
+            chromosome.penalty += int(evaluation.penalty[i])
+            chromosome.dist_s = int(evaluation.distStart[i])
+            chromosome.dist_g = int(evaluation.distGoal[i])
+            chromosome.score = self.score
+
+
+def _evaluateBatch(task):
+    "Evaluates and repairs one batch of codes in a worker process"
+    generation, batch, codes = task
+    evaluator, baseSeed = util.workerSetup()
+    generator = numpy.random.default_rng(util.derivedSeed(baseSeed, generation, batch))
+    evaluation, growth = evaluator.evaluateAndRepair(codes, generator)
+    return codes, evaluation, growth
+
+
+class ParallelPopulationEvaluator(PopulationEvaluator):
+    """
+    A PopulationEvaluator that evaluates each generation on a pool of worker
+    processes, batchSize chromosomes at a time.  The random moves of every
+    batch come from a stream seeded with util.derivedSeed(baseSeed,
+    generation, batch), so a search can be reproduced with the same base seed and any
+    number of workers.  close must be called to stop the workers.
+    """
+
+    def __init__(self, problem, workers, baseSeed = None, batchSize = BATCH_SIZE):
+        PopulationEvaluator.__init__(self, problem)
+        if workers < 1:
+            raise Exception('The number of workers must be at least 1')
+        if baseSeed is None:
+            baseSeed = random.getrandbits(64)
+        self.baseSeed = baseSeed
+        self.batchSize = batchSize
+        self.generation = 0
+        self.pool = util.workerPool(workers, None, self, baseSeed)
+
+    def __getstate__(self):
+        state = PopulationEvaluator.__getstate__(self)
+        state['pool'] = None
+        return state
+
+    def evaluatePopulation(self, population, fresh = False):
+        codes = encodePopulation(population)
+        tasks = [(self.generation, batch, codes[start:start + self.batchSize])
+                 for batch, start in enumerate(range(0, len(codes), self.batchSize))]
+        results = self.pool.map(_evaluateBatch, tasks)
+        self.generation += 1
+        codes = numpy.concatenate([batchCodes for batchCodes, evaluation, growth in results])
+        evaluation = joinEvaluations([evaluation for batchCodes, evaluation, growth in results], self.score)
+        growth = numpy.concatenate([growth for batchCodes, evaluation, growth in results])
+        self.update(population, codes, evaluation, growth, fresh)
+        return evaluation
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,243 @@
+"""
+Island-model genetic algorithm search (see GAsearch.py).
+
+Instead of one population, several islands evolve side by side, each its
+own GA population, and every migration_interval generations the best
+chromosomes of each island migrate to its neighbors, where they replace
+the least fit.  Which islands are neighbors is set by the topology:
+
+  ring             island i sends its migrants to island i + 1
+  fully connected  every island sends its migrants to all of the others
+
+Islands are evolved on a pool of worker processes for migration_interval
+generations at a time (an epoch).  The pool is started with everything the
+search needs about the problem: the layout, start, goal and step costs
+from which each worker rebuilds the PositionSearchProblem, and the
+PopulationEvaluator with the maze tables.  After that only the genes and
+fitness of each island's chromosomes and its immigrants go back and
+forth.  Every epoch of every island is seeded with util.derivedSeed(seed,
+island, epoch), so a search comes out the same with any number of workers.
+
+After every epoch the search prints, per island, its best and mean
+fitness, its diversity (the fraction of distinct chromosomes) and how many
+generations it has gone without improving its best.
+"""
+import random
+
+import GAevaluation
+import util
+from GAsearch import GA, Chromosome
+
+RING = 'ring'
+FULLY_CONNECTED = 'full'
+TOPOLOGIES = [RING, FULLY_CONNECTED]
+
+
+def migrationTargets(topology, numIslands, island):
+    "The islands that the migrants of island go to"
+    if numIslands < 2:
+        return []
+    if topology == RING:
+        return [(island + 1) % numIslands]
+    if topology == FULLY_CONNECTED:
+        return [other for other in range(numIslands) if other != island]
+    raise Exception('Unknown migration topology %s; choose from %s' % (topology, ', '.join(TOPOLOGIES)))
+
+
+def problemSpec(problem):
+    """
+    What a worker needs to rebuild a PositionSearchProblem: its layout, start,
+    goal and the cost of stepping into each open cell
+    """
+    layout = problem.gameState.data.layout
+    cells = layout.getOpenCells()
+    costs = {}
+    for i in range(0, len(cells), 2):
+        cell = (cells[i], cells[i + 1])
+        costs[cell] = problem.costFn(cell)
+    return layout, problem.getStartState(), problem.goal, costs
+
+
+def rebuildProblem(spec):
+    "The PositionSearchProblem described by a problemSpec"
+    import searchAgents
+    from pacman import GameState
+    layout, start, goal, costs = spec
+    gameState = GameState()
+    gameState.initialize(layout, 0)
+    return searchAgents.PositionSearchProblem(gameState, costFn = costs.__getitem__, goal = goal, start = start,
+                                              warn = False, visualize = False)
+
+
+def packChromosome(chromosome):
+    "An evaluated Chromosome as a plain tuple, to send between processes"
+    return (chromosome.genes, chromosome.cost, chromosome.penalty, chromosome.dist_s, chromosome.dist_g,
+            chromosome.score)
+
+
+def unpackChromosome(problem, packed):
+    "The Chromosome for problem that packChromosome made packed from"
+    genes, cost, penalty, dist_s, dist_g, score = packed
+    chromosome = Chromosome(problem, penalty = penalty, genes = genes)
+    chromosome.cost = cost
+    chromosome.dist_s = dist_s
+    chromosome.dist_g = dist_g
+    chromosome.score = score
+    return chromosome
+
+
+class IslandEpoch:
+    """
+    What one island sends back after an epoch: its evaluated population as
+    packed chromosomes, fittest first, the best (fitness, genes) it has seen
+    and, for each generation, (best fitness, mean fitness, diversity).
+    """
+
+    def __init__(self, island, population, best, history):
+        self.island = island
+        self.population = population
+        self.best = best
+        self.history = history
+
+
+def _setUpWorker(spec, evaluator, settings):
+    "The problem, evaluator and GA of a worker process (see util.workerPool)"
+    import contextlib
+    import io
+    problem = rebuildProblem(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ga = GA(problem)  # One announcement from the main process is enough
+    for name, value in settings.items():
+        setattr(ga, name, value)
+    return problem, evaluator, ga
+
+
+def _evolveIsland(task):
+    """
+    Evolves one island for one epoch in a worker process.  An island starts
+    out as a random population, which its first generation only evaluates;
+    after that the immigrants take the place of its least fit chromosomes
+    and every generation is a reproduction followed by an evaluation.
+    Returns an IslandEpoch.
+    """
+    island, epoch, baseSeed, population, immigrants, generations = task
+    problem, evaluator, ga = util.workerSetup()
+    random.seed(util.derivedSeed(baseSeed, island, epoch))
+    if population is None:
+        ga.population = [Chromosome(problem) for i in range(ga.population_size)]
+        evaluated = False
+    else:
+        population = population[:len(population) - len(immigrants)] + immigrants
+        ga.population = [unpackChromosome(problem, packed) for packed in population]
+        evaluated = True
+
+    best = None
+    history = []
+    for generation in range(generations):
+        if evaluated:
+            ga.reproduction_loop()
+        # Evaluation repairs and extends the genes, so keep the ones that earn the fitness
+        genes = [chromosome.genes for chromosome in ga.population]
+        evaluation = evaluator.evaluatePopulation(ga.population, fresh = True)
+        evaluated = True
+        fitnesses = evaluation.fitness.tolist()
+        fittest = max(range(len(fitnesses)), key = fitnesses.__getitem__)
+        if best is None or fitnesses[fittest] > best[0]:
+            best = (fitnesses[fittest], genes[fittest])
+        distinct = len(set(genes))
+        history.append((fitnesses[fittest], sum(fitnesses) / len(fitnesses), distinct / float(len(fitnesses))))
+
+    order = sorted(range(len(fitnesses)), key = lambda i: -fitnesses[i])
+    return IslandEpoch(island, [packChromosome(ga.population[i]) for i in order], best, history)
+
+
+class IslandModel:
+    """
+    Runs the island-model search for a PositionSearchProblem with the settings
+    of a GA (population size, generations, crossover and mutation rates and
+    selection) plus those of the islands:
+
+      islands            the number of islands
+      topology           RING or FULLY_CONNECTED
+      migration_interval the number of generations between migrations
+      migrants           how many of its best chromosomes an island sends
+      workers            the number of worker processes (None: one per island)
+      seed               the base seed (None draws one from random)
+    """
+
+    def __init__(self, problem, ga, islands = 4, topology = RING, migration_interval = 5, migrants = 2,
+                 workers = None, seed = None):
+        if islands < 1:
+            raise Exception('The island model needs at least one island')
+        if migrants * len(migrationTargets(topology, islands, 0)) >= ga.population_size:
+            raise Exception('%d migrants would replace a whole island' % migrants)
+        self.problem = problem
+        self.ga = ga
+        self.islands = islands
+        self.topology = topology
+        self.migration_interval = max(1, migration_interval)
+        self.migrants = migrants
+        self.workers = workers or islands
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.history = [[] for i in range(islands)]
+        self.best = None
+        self.bestIsland = None
+
+    def migrate(self, epochs):
+        "The immigrants each island receives from the IslandEpochs of the last epoch"
+        immigrants = [[] for i in range(self.islands)]
+        for result in epochs:
+            for target in migrationTargets(self.topology, self.islands, result.island):
+                immigrants[target].extend(result.population[:self.migrants])
+        return immigrants
+
+    def report(self, epoch, epochs):
+        "Prints the convergence of every island after an epoch"
+        print('Epoch %d, generation %d of %d:' % (epoch + 1, len(self.history[0]), self.ga.num_generations))
+        for result in epochs:
+            history = self.history[result.island]
+            bests = [bestFitness for bestFitness, meanFitness, diversity in history]
+            stalled = len(bests) - 1 - bests.index(max(bests))
+            bestFitness, meanFitness, diversity = history[-1]
+            print('  Island %d: best %8.1f  mean %8.1f  diversity %.2f  stalled %d generations' % (
+                result.island, max(bests), meanFitness, diversity, stalled))
+
+    def run(self):
+        "Evolves the islands and returns the best chromosome found as a list of directions"
+        settings = {'population_size': self.ga.population_size, 'probC': self.ga.probC, 'probM': self.ga.probM,
+                    'selection': self.ga.selection}
+        print('Island model: %d islands of %d, %s topology, %d migrants every %d generations, %d workers '
+              '(seed %d)' % (self.islands, self.ga.population_size, self.topology, self.migrants,
+                             self.migration_interval, self.workers, self.seed))
+        evaluator = GAevaluation.PopulationEvaluator(self.problem)
+        pool = util.workerPool(self.workers, _setUpWorker, problemSpec(self.problem), evaluator, settings)
+        try:
+            populations = [None] * self.islands
+            immigrants = [[] for i in range(self.islands)]
+            remaining = self.ga.num_generations
+            epoch = 0
+            while remaining > 0:
+                generations = min(self.migration_interval, remaining)
+                tasks = [(island, epoch, self.seed, populations[island], immigrants[island], generations)
+                         for island in range(self.islands)]
+                epochs = pool.map(_evolveIsland, tasks)
+                for result in epochs:
+                    populations[result.island] = result.population
+                    self.history[result.island].extend(result.history)
+                    if self.best is None or result.best[0] > self.best[0]:
+                        self.best = result.best
+                        self.bestIsland = result.island
+                self.report(epoch, epochs)
+                immigrants = self.migrate(epochs)
+                remaining -= generations
+                epoch += 1
+        finally:
+            pool.terminate()
+            pool.join()
+
+        best = Chromosome(self.problem, genes = self.best[1])
+        print('\nBest solution (fitness %.1f) was found on island %d' % (self.best[0], self.bestIsland))
+        print(best.chromosome)
+        return best.chromosome
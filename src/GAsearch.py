@@ -3,125 +3,143 @@ This file contains the code for the genetic-algorithm-based searchAgent
 """
 from game import Directions
 from game import Agent
+import GAselection
 import random
 import search
 import time
 import util
+import weakref
+
+# Genes are stored as one byte per move, the index of the direction in ACTIONS
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+ACTION_CODES = dict([(action, code) for code, action in enumerate(ACTIONS)])
+MOVE_CODES = [ACTION_CODES[direction] for direction in Directions.directions]
+LEGAL_CODES = bytes(MOVE_CODES)
+CHROMOSOME_LENGTH = 100
+MULTICROSSOVER_LEN = 2
+
+
+class ProblemInfo:
+    """
+    What every chromosome of one search problem shares: the problem itself,
+    the manhattan distance from its start to its goal and the maze width
+    """
+    __slots__ = ('problem', 'startDistance', 'size')
+    
+    def __init__(self, problem):
+        self.problem = problem
+        self.startDistance = util.manhattanDistance(problem.getStartState(), problem.goal)
+        self.size = len(problem.gameState.getWalls()[0])
+
+
+# The ProblemInfo of every problem that has chromosomes
+PROBLEM_INFO = weakref.WeakKeyDictionary()
+
+
+def problemInfo(problem):
+    info = PROBLEM_INFO.get(problem)
+    if info is None:
+        info = PROBLEM_INFO[problem] = ProblemInfo(problem)
+    return info
 
 
 class Chromosome:
     """
     Chromosome class that holds all of the methods for creating, storing, and processing
     each individual chromosome
+    
+    The moves are kept in genes, an immutable bytes object of ACTION_CODES, so
+    clones share them and crossover and mutation build new genes from slices.
+    The list of directions is available as chromosome.
     """
-    def __init__(self, problem, chromosome = None, penalty = 0):
-        self.chromosome = []
-        # Default build
-        if chromosome is None:
-            # print("Initialize 'None' chromosome")
-            for i in range(100):
-                self.chromosome.append(random.choice(Directions.directions))
-            # print(self.chromosome)
+    __slots__ = ('info', 'genes', 'cost', 'dist_s', 'dist_g', 'score', 'penalty')
     
+    def __init__(self, problem, chromosome = None, penalty = 0, genes = None):
+        # Default build
+        if genes is not None:
+            self.genes = genes
+        elif chromosome is None:
+            self.genes = bytes(random.choices(MOVE_CODES, k = CHROMOSOME_LENGTH))
         else:
-            self.chromosome = chromosome
-        # print("Chromosome:", self.chromosome)
-    
+            self.genes = bytes([ACTION_CODES[move] for move in chromosome])
+        
         # Pacman-specific parameters
-        self.problem = problem
+        self.info = problemInfo(problem)
         self.cost = 0
         self.dist_s = 1
-        self.dist_g = util.manhattanDistance(problem.getStartState(), problem.goal)
+        self.dist_g = self.info.startDistance
         self.score = 0
-        self.size = len(problem.gameState.getWalls()[0])
         self.penalty = penalty
     
+    def getProblem(self):
+        return self.info.problem
+    
+    problem = property(getProblem)
+    
+    def getSize(self):
+        return self.info.size
+    
+    size = property(getSize)
+    
+    def getChromosome(self):
+        "The moves as a list of directions"
+        return [ACTIONS[code] for code in self.genes]
+    
+    def setChromosome(self, chromosome):
+        self.genes = bytes([ACTION_CODES[move] for move in chromosome])
+    
+    chromosome = property(getChromosome, setChromosome)
+    
+    def __len__(self):
+        return len(self.genes)
+    
+    def getMove(self, spot):
+        return ACTIONS[self.genes[spot]]
+    
+    def setMove(self, spot, move):
+        self.genes = self.genes[:spot] + bytes((ACTION_CODES[move],)) + self.genes[spot + 1:]
+    
+    def addMove(self, move):
+        self.genes += bytes((ACTION_CODES[move],))
+    
     def crossover(self, other_chrom):
-        multicrossover_len = 2
+        # multicrossover: the children take runs of MULTICROSSOVER_LEN moves from the parents in turn, one child
+        # starting with self and the other with other_chrom
+        n = MULTICROSSOVER_LEN
+        mine = self.genes
+        other = other_chrom.genes
+        starts = range(0, max(len(mine), len(other)), 2 * n)
+        x = b''.join([mine[i:i + n] + other[i + n:i + 2 * n] for i in starts])
+        y = b''.join([other[i:i + n] + mine[i + n:i + 2 * n] for i in starts])
         
-        # multicrossover self chromosome
-        x = []
-        for i in range(0, len(self.chromosome), multicrossover_len):
-            try:  # prevent indexoutofbounds errors
-                x.extend(self.chromosome[i:i + multicrossover_len])
-            except IndexError as e:
-                x.extend(self.chromosome[i:])
-                break
-            i += multicrossover_len
-            try:  # prevent indexoutofbounds errors
-                x.extend(other_chrom.chromosome[i:i + multicrossover_len])
-            except IndexError as e:
-                x.extend(other_chrom.chromosome[i:])
-                break
-        
-        # multicrossover other chromosome
-        y = []
-        for i in range(0, len(self.chromosome), multicrossover_len):
-            try:  # prevent indexoutofbounds errors
-                y.extend(self.chromosome[i:i + multicrossover_len])
-            except IndexError as e:
-                y.extend(self.chromosome[i:])
-                break
-            i += multicrossover_len
-            try:  # prevent indexoutofbounds errors
-                y.extend(other_chrom.chromosome[i:i + multicrossover_len])
-            except IndexError as e:
-                y.extend(other_chrom.chromosome[i:])
-                break
-        
-        # crossover by appending sublists
-        child1 = Chromosome(self.problem, x)
-        child2 = Chromosome(self.problem, y)
+        child1 = Chromosome(self.problem, genes = x)
+        child2 = Chromosome(self.problem, genes = y)
         
         # Verify the children are legal before returning
-        # print("\tCrossed", self.chromosome, "with", other_chrom.chromosome, "and got", child1.chromosome, "and",
-        # child2.chromosome)
         if child1.verify_legal() and child2.verify_legal():
             return child1, child2
         else:
-            # return self.crossover(other_chrom)
             print("Invalid chromosome")
             raise Exception
     
     def mutate(self, switch = False, spot = None):
         # Find a place to mutate
-        locationOfMutation = random.randint(0, len(self.chromosome))
-        
-        # Mutate if will create legal child only
-        tempChromosome = self.clone()
-        if locationOfMutation < len(self.chromosome):
-            tempChromosome.chromosome[locationOfMutation] = random.choice(Directions.directions)
-            # if tempChromosome.verify_legal():
-            #     print("\t\tMutating",self.chromosome,"to",tempChromosome.chromosome)
-            # else:
-            #     print("remutate")
-            #     self.mutate()
+        genes = self.genes
+        locationOfMutation = random.randint(0, len(genes))
+        if locationOfMutation < len(genes):
+            genes = genes[:locationOfMutation] + bytes((random.choice(MOVE_CODES),)) + genes[locationOfMutation + 1:]
         if switch:
-            tempChromosome.chromosome[spot] = random.choice(Directions.directions)
+            genes = genes[:spot] + bytes((random.choice(MOVE_CODES),)) + genes[spot + 1:]
         else:
-            tempChromosome.chromosome.append(random.choice(Directions.directions))
-        self.chromosome = tempChromosome.chromosome
-    
-    # def new_move(self):
-    #     print("New Move")
-    #     # print(type(self.chromosome[len(self.chromosome) - 1]), self.chromosome[len(self.chromosome) - 1])
-    #     if self.chromosome[len(self.chromosome) - 1] == Directions.STOP:
-    #         self.chromosome[len(self.chromosome) - 1] = random.choice(Directions.directions)
-    #     else:
-    #         self.chromosome.append(random.choice(Directions.directions))
-    #     self.chromosome.append(Directions.STOP)
+            genes += bytes((random.choice(MOVE_CODES),))
+        self.genes = genes
     
     # Used to determine if chromosome is legal
     def verify_legal(self):
-        # print("Verify Legal")
-        # if len(self.chromosome) > 100:
-        #     return False
-        for i in range(len(self.chromosome)):
-            move = self.chromosome[i]
-            # print(type(move), move)
-            if move not in Directions.directions:
-                print("move not in Directions.directions:", move)
-                return False
+        illegal = self.genes.translate(None, LEGAL_CODES)
+        if illegal:
+            print("move not in Directions.directions:", illegal[0])
+            return False
         return True
     
     def calculate_fitness(self):
@@ -129,7 +147,12 @@ class Chromosome:
         return self.dist_s + self.score - self.cost + self.dist_g - self.penalty
     
     def clone(self):
-        return Chromosome(self.problem, self.chromosome, self.cost)
+        clone = Chromosome(self.info.problem, penalty = self.penalty, genes = self.genes)
+        clone.cost = self.cost
+        clone.dist_s = self.dist_s
+        clone.dist_g = self.dist_g
+        clone.score = self.score
+        return clone
     
     def __str__(self):
         return str(self.chromosome)
@@ -149,10 +172,24 @@ class GA:
         self.probC = .8
         self.probM = .1
         
-        # Initialize list class variables 0for population and roulette wheel
+        # Fitness evaluation: the number of worker processes that evaluate each generation (None evaluates it in
+        # this process) and the base seed of their random streams (None draws one from random)
+        self.workers = None
+        self.seed = None
+        
+        # Parent selection: an instance of one of the schemes in GAselection.SELECTIONS
+        self.selection = GAselection.RouletteSelection()
+        
+        # Island model (see GAislands.py, used by islandGenAlgSearch): the number of islands (None: one per CPU), the
+        # migration topology (GAislands.RING or GAislands.FULLY_CONNECTED), the number of generations between
+        # migrations and how many of its best chromosomes each island sends; workers sets the number of processes
+        self.islands = None
+        self.topology = 'ring'
+        self.migration_interval = 5
+        self.migrants = 2
+        
+        # Initialize list class variable for population
         self.population = []
-        self.roulette_min = [0] * self.population_size
-        self.roulette_max = [0] * self.population_size
         
         self.problem = problem
     
@@ -163,42 +200,21 @@ class GA:
             self.population.append(Chromosome(self.problem))
             # print("Populated Chromosome as:", self.population[i], self.population[i].calculate_fitness())
     
-    def calc_roulette(self):
-        """
-        Constructs a roulette wheel for parent selection.
-        """
-        # print("Calculate Roulette")
-        # Determine the total fitness
-        sum = 0
-        for chromosome in self.population:
-            sum = sum + chromosome.calculate_fitness()
-        
-        # Generates roulette wheel where roulette_max[i] - roulette_min[i] == chromosome[i].getFitness()
-        self.roulette_min[0] = 0
-        for i in range(0, self.population_size):
-            if i != 0:
-                self.roulette_min[i] = self.roulette_max[i - 1]
-            self.roulette_max[i] = self.roulette_min[i] + self.population[i].calculate_fitness() / sum
-    
-    def pick_chromosome(self):
+    def pick_parents(self):
         """
-        Using roulette wheel, returns the index of a parent for reproduction.
-        @:return index of chromosome to reproduce.
+        Using the selection scheme, returns the indices of the parents for reproduction, one per chromosome of
+        the next generation.
         """
-        # print("Pick Chromosome")
-        spin = random.uniform(0, 1)
-        for i in range(0, self.population_size):
-            if self.roulette_min[i] < spin <= self.roulette_max[i]:
-                return i
-        return self.population_size - 1
+        fitnesses = [chromosome.calculate_fitness() for chromosome in self.population]
+        return self.selection.select(fitnesses, self.population_size)
     
     def reproduction_loop(self):
         # print("Reproduction Loop")
-        self.calc_roulette()
+        parents = self.pick_parents()
         new_population = []
         for i in range(0, self.population_size, 2):
-            parent1 = self.population[self.pick_chromosome()]
-            parent2 = self.population[self.pick_chromosome()]
+            parent1 = self.population[parents[i]]
+            parent2 = self.population[parents[i + 1]]
             x = parent1.clone()
             y = parent2.clone()
             rand = random.uniform(0, 1)
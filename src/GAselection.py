@@ -0,0 +1,161 @@
+"""
+Parent selection for the genetic algorithm search (GAsearch.py).
+
+A selection scheme picks the parents of the next generation from the
+fitness of the current one.  Each scheme has a select method that takes
+the list of fitnesses and the number of parents wanted and returns their
+indices; GA.reproduction_loop pairs them up in order.  Every scheme costs
+O(n log n) or less per generation:
+
+  RouletteSelection           fitness-proportionate, with a cumulative sum
+                              of the weights and a binary search per pick
+  StochasticUniversalSampling fitness-proportionate, all picks from a single
+                              spin with evenly spaced pointers
+  RankSelection               proportionate to the rank instead of the
+                              fitness, so the spread of fitnesses matters
+                              less
+  TournamentSelection         the fittest of a few chromosomes drawn at
+                              random
+
+Fitness in the Pacman GA is often negative (the penalty and the path cost
+are subtracted), so the proportionate schemes weigh each chromosome by how
+far its fitness is above the lowest one in the population.  When all of
+them are equally fit every chromosome is equally likely.
+"""
+import bisect
+import itertools
+import random
+
+
+def shiftedWeights(fitnesses):
+    "The fitnesses minus the lowest one, so that none of them is negative"
+    lowest = min(fitnesses)
+    return [fitness - lowest for fitness in fitnesses]
+
+
+def cumulativeWheel(weights):
+    """
+    The running totals of weights, the roulette wheel the proportionate
+    schemes spin.  All zero weights make every slot equally wide.
+    """
+    if sum(weights) <= 0:
+        weights = [1] * len(weights)
+    return list(itertools.accumulate(weights))
+
+
+def spinWheel(wheel, spin):
+    "The index of the slot of the wheel that a spin in [0, wheel[-1]) lands in"
+    return min(bisect.bisect_right(wheel, spin), len(wheel) - 1)
+
+
+class Selection:
+    """
+    A parent selection scheme.  select(fitnesses, count) returns count
+    indices into fitnesses; an index may be picked more than once.
+    """
+
+    def select(self, fitnesses, count):
+        raise Exception('select is not defined for %s' % self.__class__.__name__)
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+class RouletteSelection(Selection):
+    """
+    Picks each parent with a probability proportional to its fitness above
+    the lowest one.  Building the wheel is O(n) and each pick is a binary
+    search, O(log n).
+    """
+
+    def select(self, fitnesses, count):
+        wheel = cumulativeWheel(shiftedWeights(fitnesses))
+        total = wheel[-1]
+        return [spinWheel(wheel, random.uniform(0, total)) for i in range(count)]
+
+
+class StochasticUniversalSampling(Selection):
+    """
+    Fitness-proportionate like RouletteSelection, but every parent comes from
+    one spin: count pointers spaced evenly around the wheel.  That keeps the
+    number of picks of each chromosome within one of its expected value.  The
+    picks are shuffled so that the pairs of parents are random.  O(n).
+    """
+
+    def select(self, fitnesses, count):
+        wheel = cumulativeWheel(shiftedWeights(fitnesses))
+        spacing = wheel[-1] / float(count)
+        pointer = random.uniform(0, spacing)
+        picks = []
+        slot = 0
+        for i in range(count):
+            while slot < len(wheel) - 1 and wheel[slot] <= pointer:
+                slot += 1
+            picks.append(slot)
+            pointer += spacing
+        random.shuffle(picks)
+        return picks
+
+
+class RankSelection(Selection):
+    """
+    Picks each parent with a probability proportional to its rank, from 1 for
+    the least fit to n for the fittest, so one chromosome far ahead of the
+    rest cannot take over the next generation.  Equally fit chromosomes share
+    the mean of their ranks.  Sorting is O(n log n) and each pick O(log n).
+    """
+
+    def select(self, fitnesses, count):
+        order = sorted(range(len(fitnesses)), key = lambda i: fitnesses[i])
+        ranks = [0] * len(order)
+        start = 0
+        while start < len(order):
+            end = start
+            while end + 1 < len(order) and fitnesses[order[end + 1]] == fitnesses[order[start]]:
+                end += 1
+            for i in range(start, end + 1):
+                ranks[order[i]] = (start + end) / 2.0 + 1
+            start = end + 1
+        wheel = cumulativeWheel(ranks)
+        total = wheel[-1]
+        return [spinWheel(wheel, random.uniform(0, total)) for i in range(count)]
+
+
+class TournamentSelection(Selection):
+    """
+    Each parent is the fittest of size chromosomes drawn at random (with
+    replacement).  Larger tournaments select harder.  O(size) per pick.
+    """
+
+    def __init__(self, size = 3):
+        if size < 1:
+            raise Exception('A tournament needs at least one chromosome')
+        self.size = size
+
+    def select(self, fitnesses, count):
+        n = len(fitnesses)
+        picks = []
+        for i in range(count):
+            best = random.randrange(n)
+            for j in range(self.size - 1):
+                challenger = random.randrange(n)
+                if fitnesses[challenger] > fitnesses[best]:
+                    best = challenger
+            picks.append(best)
+        return picks
+
+    def __str__(self):
+        return 'TournamentSelection(%d)' % self.size
+
+
+SELECTIONS = {'roulette': RouletteSelection,
+              'sus': StochasticUniversalSampling,
+              'rank': RankSelection,
+              'tournament': TournamentSelection}
+
+
+def getSelection(name, *args):
+    "The selection scheme called name in SELECTIONS, built with args"
+    if name not in SELECTIONS:
+        raise Exception('Unknown selection %s; choose from %s' % (name, ', '.join(sorted(SELECTIONS))))
+    return SELECTIONS[name](*args)
@@ -22,7 +22,6 @@ import searchAgents
 import util as util
 from game import Directions
 from util import Stack
-from GAsearch import GA, Chromosome
 
 
 class SearchProblem:
@@ -68,7 +67,76 @@ class SearchProblem:
         util.raiseNotDefined()
 
 
-def depthFirstSearch(problem):
+class ClosedSet:
+    """
+    The closed list of a graph search, backed by a hash set so membership tests
+    are O(1) no matter how many states have been expanded.
+
+    The policy decides when duplicate states are detected:
+      CHECK_ON_PUSH: a state is closed as soon as it is pushed, so it is pushed
+                     and expanded at most once.
+      CHECK_ON_POP:  a state is closed when it is popped; later copies of it
+                     are neither pushed nor expanded again.
+      REOPEN:        the best cost seen for each state is remembered, and a
+                     state is pushed (and expanded) again whenever it is reached
+                     with a strictly lower cost.  Needed when a heuristic is not
+                     consistent.
+    """
+    CHECK_ON_PUSH = 'push'
+    CHECK_ON_POP = 'pop'
+    REOPEN = 'reopen'
+    
+    def __init__(self, policy = CHECK_ON_POP):
+        if policy not in (ClosedSet.CHECK_ON_PUSH, ClosedSet.CHECK_ON_POP, ClosedSet.REOPEN):
+            raise ValueError('Unknown closed list policy: ' + str(policy))
+        self.policy = policy
+        self.closed = set()
+        self.bestCost = {}
+    
+    def shouldPush(self, state, cost = 0):
+        """
+        Returns True if state, reached with the given cost so far, should be
+        pushed onto the fringe.  Call this for the start state as well.
+        """
+        if self.policy == ClosedSet.CHECK_ON_PUSH:
+            if state in self.closed:
+                return False
+            self.closed.add(state)
+            return True
+        if self.policy == ClosedSet.CHECK_ON_POP:
+            return state not in self.closed
+        if state in self.bestCost and self.bestCost[state] <= cost:
+            return False
+        self.bestCost[state] = cost
+        return True
+    
+    def shouldExpand(self, state, cost = 0):
+        """
+        Returns True if state, just popped from the fringe with the given cost
+        so far, should be expanded.
+        """
+        if self.policy == ClosedSet.CHECK_ON_PUSH:
+            return True
+        if self.policy == ClosedSet.CHECK_ON_POP:
+            if state in self.closed:
+                return False
+            self.closed.add(state)
+            return True
+        # a cheaper copy of this state was pushed after this one
+        return cost <= self.bestCost.get(state, cost)
+    
+    def __contains__(self, state):
+        if self.policy == ClosedSet.REOPEN:
+            return state in self.bestCost
+        return state in self.closed
+    
+    def __len__(self):
+        if self.policy == ClosedSet.REOPEN:
+            return len(self.bestCost)
+        return len(self.closed)
+
+
+def depthFirstSearch(problem, closedPolicy = ClosedSet.CHECK_ON_POP):
     """
     Search the deepest nodes in the search tree first.
 
@@ -85,56 +153,137 @@ def depthFirstSearch(problem):
     "*** YOUR CODE HERE ***"
     stack = Stack()
     path = []
-    closed = []
+    closed = ClosedSet(closedPolicy)
+    closed.shouldPush(problem.getStartState(), 0)
     stack.push((problem.getStartState(), path))
     while True:
         if stack.isEmpty():
             return []
         state, path = stack.pop()
-        closed.append(state)
+        # the depth of a node stands in for its cost under the REOPEN policy
+        if not closed.shouldExpand(state, len(path)):
+            continue
         if problem.isGoalState(state):
             return path
-        closed.append(state)
         successor = problem.getSuccessors(state)
         successor = sorted(successor, key = lambda x: x[2])
         for s in successor:
-            if s[0] not in closed:
+            if closed.shouldPush(s[0], len(path) + 1):
                 newPath = path + [s[1]]
                 stack.push((s[0], newPath))
 
 
+def breadthFirstSearch(problem, closedPolicy = ClosedSet.CHECK_ON_POP, fringeCapacity = None):
+    """Search the shallowest nodes in the search tree first.
+
+    The largest fringe size seen is stored in problem._fringeHighWaterMark;
+    fringeCapacity, if given, caps the number of nodes on the fringe.
+    """
+    "*** YOUR CODE HERE ***"
+    queue = util.BoundedQueue(fringeCapacity)
+    closed = ClosedSet(closedPolicy)
+    # node table: each entry is (state, action, parent index, cost so far)
+    nodes = [(problem.getStartState(), None, None, 0)]
+    closed.shouldPush(problem.getStartState(), 0)
+    queue.push(0)
+    while True:
+        if queue.isEmpty():
+            problem._fringeHighWaterMark = queue.highWaterMark
+            return []
+        index = queue.pop()
+        state, _, _, depth = nodes[index]
+        if not closed.shouldExpand(state, depth):
+            continue
+        if problem.isGoalState(state):
+            problem._fringeHighWaterMark = queue.highWaterMark
+            return reconstructPath(nodes, index)
+        for successor, action, _ in problem.getSuccessors(state):
+            if closed.shouldPush(successor, depth + 1):
+                nodes.append((successor, action, index, depth + 1))
+                queue.push(len(nodes) - 1)
+
+
+def uniformCostSearch(problem, closedPolicy = ClosedSet.CHECK_ON_POP):
+    """Search the node of least total cost first.
+
+    Integer step costs (every maze with the default cost function) are queued
+    in a bucket queue with O(1) operations; real-valued costs such as .5**x
+    make the queue fall back to a binary heap.
+    """
+    "*** YOUR CODE HERE ***"
+    return bestFirstSearch(problem, util.BucketPriorityQueue(), nullHeuristic, closedPolicy)
+
+
 def genAlgSearch(problem):
     """Use a genetic algorithm to create possible paths
     this method will verify the path and make a new generation if it doesn't work
     
     This should replace the run() method in GAsearch.py"""
+    from GAsearch import GA, Chromosome
     print("Genetic Algorithm Search")
     ga = GA(problem)
     
+    # Evaluate whole populations at once with NumPy when it is available
+    try:
+        import GAevaluation
+    except ImportError:
+        evaluator = None
+    else:
+        if ga.workers:
+            evaluator = GAevaluation.ParallelPopulationEvaluator(problem, ga.workers, ga.seed)
+        else:
+            evaluator = GAevaluation.PopulationEvaluator(problem)
+    try:
+        return _evolve(problem, ga, evaluator)
+    finally:
+        if ga.workers and evaluator is not None:
+            evaluator.close()
+
+
+def islandGenAlgSearch(problem):
+    """Run the genetic algorithm as an island model: several populations evolve in parallel
+    worker processes and regularly swap their best chromosomes (see GAislands.py)"""
+    import multiprocessing
+    from GAsearch import GA
+    import GAislands
+    print("Island Genetic Algorithm Search")
+    ga = GA(problem)
+    model = GAislands.IslandModel(problem, ga, ga.islands or multiprocessing.cpu_count(), ga.topology,
+                                  ga.migration_interval, ga.migrants, ga.workers, ga.seed)
+    return model.run()
+
+
+def _evolve(problem, ga, evaluator):
+    "The generation loop of genAlgSearch; evaluator is None without NumPy"
+    from GAsearch import Chromosome
     best_overall = Chromosome(problem, [Directions.STOP], 500)
     best_generation = 0
     for gen in range(ga.num_generations):  # loop generations
         best = Chromosome(problem, [Directions.STOP], 300)  # empty initial best generation chromosome
         ga.build_population(best)
         # print(ga.population)
-        for pop in ga.population:
-            state, path = build_path(problem, problem.getStartState(), pop)
-            
-            # update scores for fitness function
-            pop.cost = problem.getCostOfActions(path)
-            pop.dist_s = searchAgents.mazeDistance(state, problem.getStartState(), problem.gameState)
-            pop.dist_g = searchAgents.mazeDistance(state, problem.goal, problem.gameState)
-            pop.score = problem.gameState.getScore()
-            pop.size = len(problem.gameState.getWalls()[0])
+        # Evaluation repairs and extends the genes, so keep the ones that earn the fitness
+        genes = [pop.genes for pop in ga.population]
+        if evaluator is not None:
+            evaluator.evaluatePopulation(ga.population)
+        for pop, popGenes in zip(ga.population, genes):
+            if evaluator is None:
+                state, path = build_path(problem, problem.getStartState(), pop)
+                
+                # update scores for fitness function
+                pop.cost = problem.getCostOfActions(path)
+                pop.dist_s = searchAgents.mazeDistance(state, problem.getStartState(), problem.gameState)
+                pop.dist_g = searchAgents.mazeDistance(state, problem.goal, problem.gameState)
+                pop.score = problem.gameState.getScore()
             
             # print("Gene:", pop.calculate_fitness(), "\tBest:", best.calculate_fitness(), end = '\t')
             if pop.calculate_fitness() > best.calculate_fitness():
                 best = pop.clone()
+                best.genes = popGenes
                 # print("Clone:", best.calculate_fitness())
             # optimization
-            if not problem.isGoalState(state):  # did not reach goal state, add another move
-                pop.chromosome.append(
-                    random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]))
+            if evaluator is None and not problem.isGoalState(state):  # did not reach goal state, add another move
+                pop.addMove(random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]))
         if best.calculate_fitness() > best_overall.calculate_fitness():
             best_overall = best
             best_generation = gen
@@ -152,9 +301,9 @@ def genAlgSearch(problem):
 def build_path(problem, state, pop, rerun = False):
     path = []
     spot = 0
-    for spot in range(len(pop.chromosome)):
-        move = pop.chromosome[spot]
-        # print(len(pop.chromosome))
+    for spot in range(len(pop)):
+        move = pop.getMove(spot)
+        # print(len(pop))
         if move == Directions.STOP:
             pass
         successor = problem.getSuccessors(state)  # list: [next position, direction taken, cost]
@@ -175,13 +324,13 @@ def build_path(problem, state, pop, rerun = False):
         if not valid:  # tried to move into a wall
             # print(pop.penalty)
             pop.penalty += 1  # each move into wall decreases fitness
-            pop.chromosome[spot] = random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST])
+            pop.setMove(spot, random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]))
     # optimization
     if problem.isGoalState(state):  # reached the goal state, end
         # print("Found the goal!!!")
         return state, path
     elif not rerun:  # did not reach goal state, add another move
-        pop.chromosome.append(random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]))
+        pop.addMove(random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]))
         build_path(problem, state, pop, rerun = True)
     return state, path
 
@@ -194,30 +343,68 @@ def nullHeuristic(state, problem = None):
     return 0
 
 
-def aStarSearch(problem, heuristic = nullHeuristic):
-    """Search the node that has the lowest combined cost and heuristic first."""
+def aStarSearch(problem, heuristic = nullHeuristic, closedPolicy = ClosedSet.CHECK_ON_POP):
+    """Search the node that has the lowest combined cost and heuristic first.
+
+    Use closedPolicy=ClosedSet.REOPEN with a heuristic that is not consistent.
+    """
     "*** YOUR CODE HERE ***"
-    queue = util.PriorityQueue()
-    closed = []
-    #(state,path,cost) is added to the queue based on the cost as a priority
-    queue.push((problem.getStartState(),[]),0)
+    return bestFirstSearch(problem, util.PriorityQueue(), heuristic, closedPolicy)
+
+
+def bestFirstSearch(problem, queue, heuristic = nullHeuristic, closedPolicy = ClosedSet.CHECK_ON_POP):
+    """
+    The search engine behind uniformCostSearch and aStarSearch: nodes are
+    popped from queue (any priority queue with push(item, priority)) in order
+    of f = g + h.
+
+    The cost so far is carried along with each node instead of being recomputed
+    from the whole path, and each node only remembers its parent, so the list
+    of actions is rebuilt once when the goal is popped.
+    """
+    closed = ClosedSet(closedPolicy)
+    # node table: each entry is (state, action, parent index, cost so far)
+    nodes = [(problem.getStartState(), None, None, 0)]
+    # the index of a node in the table is added to the queue based on f = g + h as a priority
+    closed.shouldPush(problem.getStartState(), 0)
+    queue.push(0, heuristic(problem.getStartState(), problem))
     while True:
-        if queue.isEmpty():#If queue is empty and goal not reached, maze is not possible
+        if queue.isEmpty():  # If queue is empty and goal not reached, maze is not possible
             return []
-        state,path = queue.pop()
-        closed.append(state)
+        index = queue.pop()
+        state, _, _, cost = nodes[index]
+        if not closed.shouldExpand(state, cost):
+            continue
         if problem.isGoalState(state):
-            return path
-        successor = problem.getSuccessors(state)
-        for s in successor:
-            if s[0] not in closed:
-                #Push new path
-                newPath = path  + [s[1]]
-                cost = problem.getCostOfActions(newPath) + heuristic(s[0],problem)
-                queue.push((s[0],newPath),cost)
+            return reconstructPath(nodes, index)
+        for successor, action, stepCost in problem.getSuccessors(state):
+            newCost = cost + stepCost
+            if closed.shouldPush(successor, newCost):
+                # Push new node
+                nodes.append((successor, action, index, newCost))
+                queue.push(len(nodes) - 1, newCost + heuristic(successor, problem))
+
+
+def reconstructPath(nodes, index):
+    """
+    Follows the parent pointers in a node table from the node at index back to
+    the start node and returns the list of actions that leads to it.
+
+    Each node in the table is a tuple (state, action, parent index, cost so far);
+    the start node has no action and no parent.
+    """
+    path = []
+    while nodes[index][2] is not None:
+        _, action, index, _ = nodes[index]
+        path.append(action)
+    path.reverse()
+    return path
 
 
 # Abbreviations
+bfs = breadthFirstSearch
 dfs = depthFirstSearch
+ucs = uniformCostSearch
 astar = aStarSearch
 gas = genAlgSearch
+igas = islandGenAlgSearch
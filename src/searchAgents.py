@@ -37,6 +37,9 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+import array
+import hashlib
+import os
 import time
 import search
 import util
@@ -120,6 +123,8 @@ class SearchAgent(Agent):
         print(('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime)))
         if '_expanded' in dir(problem):
             print(('Search nodes expanded: %d' % problem._expanded))
+        if '_fringeHighWaterMark' in dir(problem):
+            print(('Largest fringe: %d' % problem._fringeHighWaterMark))
     
     def getAction(self, state):
         """
@@ -160,6 +165,8 @@ class PositionSearchProblem(search.SearchProblem):
         """
         self.gameState = gameState
         self.walls = gameState.getWalls()
+        # The legal moves out of every open cell, from the layout (see Layout.getNeighborTable)
+        self.neighborTable = gameState.data.layout.getNeighborTable()
         self.startState = gameState.getPacmanPosition()
         if start is not None:
             self.startState = start
@@ -171,6 +178,7 @@ class PositionSearchProblem(search.SearchProblem):
         
         # For display purposes
         self._visited, self._visitedlist, self._expanded = {}, [], 0  # DO NOT CHANGE
+        self._successorTable = {}
     
     def getStartState(self):
         return self.startState
@@ -200,15 +208,22 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
         
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x, y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append((nextState, action, cost))
+        # Successors of a cell never change, so they are compiled the first time
+        # the cell is expanded and looked up afterwards
+        successors = self._successorTable.get(state)
+        if successors is None:
+            neighbors = self.neighborTable.get(state)
+            if neighbors is None:
+                neighbors = []
+                for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                    x, y = state
+                    dx, dy = Actions.directionToVector(action)
+                    nextx, nexty = int(x + dx), int(y + dy)
+                    if not self.walls[nextx][nexty]:
+                        neighbors.append(((nextx, nexty), action))
+            successors = tuple((nextState, action, self.costFn(nextState)) for nextState, action in neighbors)
+            self._successorTable[state] = successors
+        successors = list(successors)
         
         # Bookkeeping for display purposes
         self._expanded += 1  # DO NOT CHANGE
@@ -397,11 +412,12 @@ class FoodSearchProblem:
 
     A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodGrid:       a BitGrid (see game.py) of either True or False, specifying remaining food
     """
     
     def __init__(self, startingGameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        # The food is kept as a BitGrid so copying, hashing and counting it per successor is cheap
+        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood().toBitGrid())
         self.walls = startingGameState.getWalls()
         self.startingGameState = startingGameState
         self._expanded = 0  # DO NOT CHANGE
@@ -422,8 +438,7 @@ class FoodSearchProblem:
             dx, dy = Actions.directionToVector(direction)
             nextx, nexty = int(x + dx), int(y + dy)
             if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
+                nextFood = state[1].withCell(nextx, nexty, False)
                 successors.append((((nextx, nexty), nextFood), direction, 1))
         return successors
     
@@ -540,7 +555,9 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         self.walls = gameState.getWalls()
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
+        self.neighborTable = gameState.data.layout.getNeighborTable()
         self._visited, self._visitedlist, self._expanded = {}, [], 0  # DO NOT CHANGE
+        self._successorTable = {}
     
     def isGoalState(self, state):
         """
@@ -562,11 +579,143 @@ def mazeDistance(point1, point2, gameState):
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
     This might be a useful helper function for your ApproximateSearchAgent.
+
+    The distances come from a MazeDistances table that is built once per set of
+    walls, so every call after the first one is a constant-time lookup.  Returns
+    0 if there is no path between the points.
     """
     x1, y1 = point1
     x2, y2 = point2
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start = point1, goal = point2, warn = False, visualize = False)
-    return len(search.dfs(prob))
+    distance = getMazeDistances(walls, MAZE_DISTANCE_CACHE_DIR).getDistance(point1, point2)
+    if distance is None:
+        return 0
+    return distance
+
+
+# Directory where getMazeDistances saves and looks for distance tables; None keeps them in memory only
+MAZE_DISTANCE_CACHE_DIR = None
+MAZE_DISTANCE_CACHE = {}
+
+
+def getMazeDistances(walls, cacheDir = None):
+    """
+    Returns the MazeDistances for a Grid of walls.  Tables are cached per wall
+    signature, so every layout with the same walls shares one table.  If cacheDir
+    is given, the table is also saved there and loaded on later runs instead of
+    being recomputed.
+    """
+    distances = getattr(walls, '_mazeDistances', None)
+    if distances is not None:
+        return distances
+    signature = MazeDistances.wallSignature(walls)
+    if signature not in MAZE_DISTANCE_CACHE:
+        distances = None
+        if cacheDir is not None:
+            fileName = os.path.join(cacheDir, 'mazeDistances-%s.bin' % signature)
+            distances = MazeDistances.load(walls, fileName)
+            if distances is None:
+                distances = MazeDistances(walls)
+                try:
+                    distances.save(fileName)
+                except (IOError, OSError):
+                    pass  # Without a writable cache the table is just recomputed next time
+        if distances is None:
+            distances = MazeDistances(walls)
+        MAZE_DISTANCE_CACHE[signature] = distances
+    walls._mazeDistances = MAZE_DISTANCE_CACHE[signature]
+    return walls._mazeDistances
+
+
+class MazeDistances:
+    """
+    The maze distance between every pair of open cells of a layout.
+
+    Open cells are numbered column by column, and the distances are stored in one
+    flat array of unsigned integers (N*N entries for N open cells), filled in by
+    a breadth first search from every open cell.  Looking up a distance is O(1).
+    """
+    
+    def __init__(self, walls, matrix = None):
+        self.width, self.height = walls.width, walls.height
+        self.cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+        self.typecode = 'H' if len(self.cells) < 0xFFFF else 'I'
+        self.unreachable = 0xFFFF if self.typecode == 'H' else 0xFFFFFFFF
+        if matrix is None:
+            matrix = self._computeMatrix(walls)
+        self.matrix = matrix
+    
+    def _computeMatrix(self, walls):
+        numCells = len(self.cells)
+        neighbors = []
+        for cell in self.cells:
+            neighbors.append([self.cellIndex[n] for n in Actions.getLegalNeighbors(cell, walls)
+                              if n != cell and n in self.cellIndex])
+        matrix = array.array(self.typecode, [self.unreachable]) * (numCells * numCells)
+        for source in range(numCells):
+            row = source * numCells
+            matrix[row + source] = 0
+            frontier = [source]
+            distance = 0
+            while frontier:
+                distance += 1
+                nextFrontier = []
+                for cell in frontier:
+                    for neighbor in neighbors[cell]:
+                        if matrix[row + neighbor] == self.unreachable:
+                            matrix[row + neighbor] = distance
+                            nextFrontier.append(neighbor)
+                frontier = nextFrontier
+        return matrix
+    
+    def getDistance(self, point1, point2):
+        """
+        Returns the maze distance between two open cells, or None if there is no
+        path between them.
+        """
+        i = self.cellIndex[point1]
+        j = self.cellIndex[point2]
+        distance = self.matrix[i * len(self.cells) + j]
+        if distance == self.unreachable:
+            return None
+        return distance
+    
+    def wallSignature(walls):
+        "A short string that identifies a set of walls"
+        text = '%d,%d\n%s' % (walls.width, walls.height, str(walls))
+        return hashlib.sha1(text.encode('ascii')).hexdigest()
+    
+    wallSignature = staticmethod(wallSignature)
+    
+    def save(self, fileName):
+        # Written under a temporary name so a concurrent reader never sees half a table
+        tempName = '%s.%d.tmp' % (fileName, os.getpid())
+        f = open(tempName, 'wb')
+        try: self.matrix.tofile(f)
+        finally: f.close()
+        os.replace(tempName, fileName)
+    
+    def load(walls, fileName):
+        """
+        Returns the MazeDistances saved in fileName for these walls, or None if
+        the file is missing or does not hold a table of the right size.
+        """
+        if not os.path.exists(fileName):
+            return None
+        numCells = len([1 for x in range(walls.width) for y in range(walls.height) if not walls[x][y]])
+        matrix = array.array('H' if numCells < 0xFFFF else 'I')
+        if os.path.getsize(fileName) != numCells * numCells * matrix.itemsize:
+            return None
+        f = open(fileName, 'rb')
+        try:
+            matrix.fromfile(f, numCells * numCells)
+        except EOFError:
+            return None
+        finally:
+            f.close()
+        return MazeDistances(walls, matrix)
+    
+    load = staticmethod(load)
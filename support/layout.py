@@ -13,13 +13,22 @@
 
 
 from util import manhattanDistance
-from game import Grid
+from game import Grid, BitGrid
+import array
+import hashlib
+import mmap
 import os
 import random
+import struct
+import sys
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
 
+# Directory where tryToLoad keeps compiled layouts (see compileLayout); None
+# parses every layout file on every run
+LAYOUT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.layoutCache')
+
 class Layout:
     """
     A Layout manages the static information about the game board.
@@ -36,6 +45,8 @@ class Layout:
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.openCells = None
+        self.neighbors = None
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -90,8 +101,80 @@ class Layout:
     def __str__(self):
         return "\n".join(self.layoutText)
 
+    def __getstate__(self):
+        # Memory-mapped arrays of a compiled layout are copied out for pickling
+        state = self.__dict__.copy()
+        state.pop('_mmap', None)
+        for key in ('openCells', 'neighbors'):
+            if isinstance(state[key], memoryview):
+                state[key] = array.array(state[key].format, state[key])
+        return state
+
+    def getOpenCells(self):
+        """
+        The open (non-wall) cells, x-major, as a flat array x0, y0, x1, y1, ...
+        The position of a cell in this list is its open-cell index.
+        """
+        if self.openCells is None:
+            cells = array.array('H')
+            for x in range(self.width):
+                for y in range(self.height):
+                    if not self.walls[x][y]:
+                        cells.append(x)
+                        cells.append(y)
+            self.openCells = cells
+        return self.openCells
+
+    def getNeighbors(self):
+        """
+        The neighbor table: for open-cell index i, entries 4i to 4i+3 hold the
+        open-cell indices of the cells North, South, East and West of it, or
+        -1 where there is a wall or the edge of the board.
+        """
+        if self.neighbors is None:
+            cells = self.getOpenCells()
+            index = {}
+            for i in range(len(cells) // 2):
+                index[(cells[2 * i], cells[2 * i + 1])] = i
+            neighbors = array.array('i')
+            for i in range(len(cells) // 2):
+                x, y = cells[2 * i], cells[2 * i + 1]
+                for dx, dy in NEIGHBOR_VECTORS:
+                    neighbors.append(index.get((x + dx, y + dy), -1))
+            self.neighbors = neighbors
+        return self.neighbors
+
+    def getNeighborTable(self):
+        """
+        The neighbor table as PositionSearchProblem uses it: a dictionary from
+        each open cell to its ((nextx, nexty), action) moves in the order
+        North, South, East, West.  It is built once and kept on the walls Grid.
+        """
+        table = getattr(self.walls, '_neighborTable', None)
+        if table is not None:
+            return table
+        from game import Directions
+        actions = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+        cells = self.getOpenCells()
+        neighbors = self.getNeighbors()
+        positions = [(cells[2 * i], cells[2 * i + 1]) for i in range(len(cells) // 2)]
+        table = {}
+        for i, cell in enumerate(positions):
+            table[cell] = tuple([(positions[j], action) for j, action in zip(neighbors[4 * i:4 * i + 4], actions)
+                                 if j >= 0])
+        self.walls._neighborTable = table
+        return table
+
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        # Copy the parsed grids and lists instead of parsing the text again
+        layout = Layout.__new__(Layout)
+        layout.__dict__.update(self.__dict__)
+        layout.walls = self.walls.copy()
+        layout.food = self.food.copy()
+        layout.capsules = self.capsules[:]
+        layout.agentPositions = self.agentPositions[:]
+        layout.layoutText = self.layoutText[:]
+        return layout
 
     def processLayoutText(self, layoutText):
         """
@@ -143,8 +226,152 @@ def getLayout(name, back = 2):
         os.chdir(curdir)
     return layout
 
-def tryToLoad(fullname):
+def tryToLoad(fullname, cacheDir = None):
+    """
+    Loads the layout in fullname, or returns None if there is no such file.
+    The compiled layout in cacheDir (LAYOUT_CACHE_DIR by default) is used
+    when there is one for this file's content; otherwise the file is parsed
+    and compiled there for the next run.
+    """
     if(not os.path.exists(fullname)): return None
-    f = open(fullname)
-    try: return Layout([line.strip() for line in f])
+    if cacheDir is None:
+        cacheDir = LAYOUT_CACHE_DIR
+    f = open(fullname, 'rb')
+    try: content = f.read()
     finally: f.close()
+    if cacheDir is None:
+        return Layout([line.strip() for line in content.decode('utf-8').splitlines()])
+
+    compiledName = os.path.join(cacheDir, hashlib.sha1(content).hexdigest() + '.layc')
+    layout = loadCompiledLayout(compiledName)
+    if layout is None:
+        layout = Layout([line.strip() for line in content.decode('utf-8').splitlines()])
+        try:
+            if not os.path.isdir(cacheDir):
+                os.makedirs(cacheDir)
+            compileLayout(layout, compiledName)
+        except (IOError, OSError):
+            pass  # Without a writable cache the layout is just parsed each time
+    return layout
+
+# The compiled layout format written by compileLayout.  After the header come
+# the layout text, the walls and food bitboards (bit x * height + y, as in
+# BitGrid), the capsules and agent positions as (x, y) and (isPacman, x, y)
+# shorts, and then, 4-byte aligned, the open cells and the neighbor table of
+# getOpenCells and getNeighbors.  Numbers are in the machine's byte order,
+# which the header records, so that the arrays can be used straight from the
+# memory-mapped file.
+COMPILED_MAGIC = b'PLAYC1'
+COMPILED_HEADER = struct.Struct('=6s1sxHHHHHII')
+NEIGHBOR_VECTORS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+def _align(offset):
+    return (offset + 3) & ~3
+
+def _bitBytes(grid):
+    return grid.toBitGrid().bits.to_bytes((grid.width * grid.height + 7) // 8, 'big')
+
+def _gridFromBits(data, width, height):
+    # All the bits written out as one string of 0/1 bytes, cut into columns
+    numCells = width * height
+    cells = format(int.from_bytes(data, 'big'), '0%db' % numCells)[::-1].encode('ascii').translate(_BIT_CELLS)
+    grid = Grid(0, 0)
+    grid.width = width
+    grid.height = height
+    grid.data = [list(map(bool, cells[x * height:(x + 1) * height])) for x in range(width)]
+    return grid
+
+_BIT_CELLS = bytes.maketrans(b'01', b'\0\1')
+
+def compileLayout(layout, fileName):
+    "Writes layout to fileName in the compiled layout format"
+    text = '\n'.join(layout.layoutText).encode('utf-8')
+    cells = layout.getOpenCells()
+    neighbors = layout.getNeighbors()
+    parts = [COMPILED_HEADER.pack(COMPILED_MAGIC, sys.byteorder[0].encode('ascii'), layout.width, layout.height,
+                                  layout.numGhosts, len(layout.capsules), len(layout.agentPositions),
+                                  len(cells) // 2, len(text)),
+             text, _bitBytes(layout.walls), _bitBytes(layout.food)]
+    for x, y in layout.capsules:
+        parts.append(struct.pack('=HH', x, y))
+    for isPacman, (x, y) in layout.agentPositions:
+        parts.append(struct.pack('=HHH', int(isPacman), x, y))
+    data = b''.join(parts)
+    data += b'\0' * (_align(len(data)) - len(data))
+    data += array.array('H', cells).tobytes()
+    data += b'\0' * (_align(len(data)) - len(data))
+    data += array.array('i', neighbors).tobytes()
+
+    # Written under a temporary name so a reader never sees half a file
+    tempName = '%s.%d.tmp' % (fileName, os.getpid())
+    f = open(tempName, 'wb')
+    try: f.write(data)
+    finally: f.close()
+    os.replace(tempName, fileName)
+
+def compiledSize(width, height, numCapsules, numAgents, numOpen, textLength):
+    "The length of a compiled layout file with these header fields"
+    gridBytes = (width * height + 7) // 8
+    size = COMPILED_HEADER.size + textLength + 2 * gridBytes + 4 * numCapsules + 6 * numAgents
+    size = _align(size) + 4 * numOpen
+    return _align(size) + 16 * numOpen
+
+def loadCompiledLayout(fileName):
+    """
+    Returns the Layout compiled into fileName, or None if the file is missing,
+    was not written by compileLayout on a machine with this byte order, or is
+    not complete (say a run was killed while it was written).  The open cells
+    and neighbor table stay in the memory-mapped file.
+    """
+    if not os.path.exists(fileName):
+        return None
+    f = open(fileName, 'rb')
+    try:
+        size = os.fstat(f.fileno()).st_size
+        if size < COMPILED_HEADER.size:
+            return None
+        data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    finally:
+        f.close()
+    magic, byteorder, width, height, numGhosts, numCapsules, numAgents, numOpen, textLength = \
+        COMPILED_HEADER.unpack_from(data)
+    if magic != COMPILED_MAGIC or byteorder != sys.byteorder[0].encode('ascii'):
+        return None
+    if size != compiledSize(width, height, numCapsules, numAgents, numOpen, textLength):
+        return None
+    try:
+        return _readCompiledLayout(data, width, height, numGhosts, numCapsules, numAgents, numOpen, textLength)
+    except (struct.error, ValueError, TypeError):
+        return None
+
+def _readCompiledLayout(data, width, height, numGhosts, numCapsules, numAgents, numOpen, textLength):
+    layout = Layout.__new__(Layout)
+    layout._mmap = data
+    layout.width = width
+    layout.height = height
+    layout.numGhosts = numGhosts
+    offset = COMPILED_HEADER.size
+    layout.layoutText = data[offset:offset + textLength].decode('utf-8').split('\n')
+    offset += textLength
+    gridBytes = (width * height + 7) // 8
+    layout.walls = _gridFromBits(data[offset:offset + gridBytes], width, height)
+    offset += gridBytes
+    foodBits = data[offset:offset + gridBytes]
+    layout.food = _gridFromBits(foodBits, width, height)
+    layout.totalFood = BitGrid(width, height, bits = int.from_bytes(foodBits, 'big')).count()
+    offset += gridBytes
+    layout.capsules = []
+    for i in range(numCapsules):
+        layout.capsules.append(struct.unpack_from('=HH', data, offset))
+        offset += 4
+    layout.agentPositions = []
+    for i in range(numAgents):
+        isPacman, x, y = struct.unpack_from('=HHH', data, offset)
+        layout.agentPositions.append((bool(isPacman), (x, y)))
+        offset += 6
+    view = memoryview(data)
+    offset = _align(offset)
+    layout.openCells = view[offset:offset + 4 * numOpen].cast('H')
+    offset = _align(offset + 4 * numOpen)
+    layout.neighbors = view[offset:offset + 16 * numOpen].cast('i')
+    return layout
@@ -0,0 +1,76 @@
+# test_GAselection.py
+# -------------------
+# Every parent selection scheme must cope with the fitnesses the Pacman GA
+# produces, which are often all negative and early on often all equal.
+
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import GAselection
+
+PICKS = 6000
+
+
+def pickCounts(selection, fitnesses, count = PICKS):
+    picks = selection.select(fitnesses, count)
+    counts = [0] * len(fitnesses)
+    for pick in picks:
+        counts[pick] += 1
+    return picks, counts
+
+
+class SelectionTest(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        self.selections = [GAselection.getSelection(name) for name in sorted(GAselection.SELECTIONS)]
+
+    def assertValidPicks(self, picks, fitnesses, count):
+        self.assertEqual(len(picks), count)
+        for pick in picks:
+            self.assertTrue(0 <= pick < len(fitnesses))
+
+    def testAllNegative(self):
+        fitnesses = [-40.0, -3.5, -120.0, -7.0, -3.5, -61.0]
+        fittest = [1, 4]
+        leastFit = 2
+        for selection in self.selections:
+            picks, counts = pickCounts(selection, fitnesses)
+            self.assertValidPicks(picks, fitnesses, PICKS)
+            for i in fittest:
+                self.assertTrue(counts[i] > counts[leastFit], '%s: %s' % (selection, counts))
+                self.assertTrue(counts[i] > PICKS / len(fitnesses), '%s: %s' % (selection, counts))
+            self.assertTrue(counts[leastFit] < PICKS / len(fitnesses), '%s: %s' % (selection, counts))
+
+    def testAllEqual(self):
+        for fitnesses in [[-25.0] * 6, [0.0] * 6, [13.0] * 6]:
+            for selection in self.selections:
+                picks, counts = pickCounts(selection, fitnesses)
+                self.assertValidPicks(picks, fitnesses, PICKS)
+                expected = PICKS / len(fitnesses)
+                for count in counts:
+                    self.assertTrue(0.85 * expected < count < 1.15 * expected, '%s: %s' % (selection, counts))
+
+    def testStochasticUniversalSamplingIsExact(self):
+        selection = GAselection.StochasticUniversalSampling()
+        picks, counts = pickCounts(selection, [-9.0] * 5, 10)
+        self.assertEqual(counts, [2] * 5)
+        picks, counts = pickCounts(selection, [-10.0, -6.0, -2.0], 6)
+        self.assertEqual(counts, [0, 2, 4])
+
+    def testSingleChromosome(self):
+        for selection in self.selections:
+            self.assertEqual(selection.select([-5.0], 4), [0] * 4)
+
+    def testUnknownSelection(self):
+        self.assertRaises(Exception, GAselection.getSelection, 'lottery')
+        self.assertRaises(Exception, GAselection.TournamentSelection, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
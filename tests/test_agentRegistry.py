@@ -0,0 +1,129 @@
+# test_agentRegistry.py
+# ---------------------
+# The agent index must follow the agents modules on the path: re-parse a
+# module whose modification time or size changed, drop modules that are
+# gone, and leave 'module:Class' names to the import machinery.
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import agentRegistry
+
+
+class AgentRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.indexFile = os.path.join(self.directory, 'index.json')
+        self.pythonPath = os.environ.get('PYTHONPATH')
+        os.environ['PYTHONPATH'] = self.directory
+        sys.path.insert(0, self.directory)
+        self.registry = agentRegistry.AgentRegistry(self.indexFile)
+
+    def tearDown(self):
+        sys.path.remove(self.directory)
+        if self.pythonPath is None:
+            del os.environ['PYTHONPATH']
+        else:
+            os.environ['PYTHONPATH'] = self.pythonPath
+        for name in list(sys.modules):
+            if name.startswith('registryTest'):
+                del sys.modules[name]
+        shutil.rmtree(self.directory)
+
+    def writeModule(self, moduleName, source, mtime = None):
+        path = os.path.join(self.directory, moduleName + '.py')
+        f = open(path, 'w')
+        f.write(source)
+        f.close()
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def indexedClasses(self):
+        f = open(self.indexFile)
+        index = json.load(f)
+        f.close()
+        return dict([(os.path.basename(path), entry['classes']) for path, entry in index['modules'].items()
+                     if path.startswith(os.path.abspath(self.directory))])
+
+    def testFindsAndIndexesClasses(self):
+        self.writeModule('registryTestOneAgents', 'class AlphaAgent:\n    pass\nclass _Helper:\n    pass\n')
+        self.writeModule('registryTestTwoAgents', 'class BravoAgent:\n    pass\n')
+        self.writeModule('registryTestNotAnAgentModule', 'class CharlieAgent:\n    pass\n')
+        self.assertEqual(self.registry.findModule('BravoAgent'), ['registryTestTwoAgents'])
+        self.assertEqual(self.registry.findModule('CharlieAgent'), [])
+        self.assertEqual(self.indexedClasses(), {'registryTestOneAgents.py': ['AlphaAgent', '_Helper'],
+                                                 'registryTestTwoAgents.py': ['BravoAgent']})
+        agent = self.registry.load('AlphaAgent')
+        self.assertEqual(agent.__name__, 'AlphaAgent')
+        self.assertTrue('registryTestOneAgents' in sys.modules)
+        self.assertFalse('registryTestTwoAgents' in sys.modules)
+
+    def testRefreshesWhenModificationTimeChanges(self):
+        self.writeModule('registryTestAgents', 'class AlphaAgent: pass\n', mtime = 1000000000)
+        self.assertEqual(self.registry.findModule('AlphaAgent'), ['registryTestAgents'])
+        # Same size and modification time: the index is trusted without parsing
+        self.writeModule('registryTestAgents', 'class BravoAgent: pass\n', mtime = 1000000000)
+        self.assertEqual(agentRegistry.AgentRegistry(self.indexFile).findModule('BravoAgent'), [])
+        self.writeModule('registryTestAgents', 'class BravoAgent: pass\n', mtime = 1000000100)
+        registry = agentRegistry.AgentRegistry(self.indexFile)
+        self.assertEqual(registry.findModule('BravoAgent'), ['registryTestAgents'])
+        self.assertEqual(registry.findModule('AlphaAgent'), [])
+        self.assertEqual(self.indexedClasses(), {'registryTestAgents.py': ['BravoAgent']})
+
+    def testRefreshesWhenSizeChanges(self):
+        self.writeModule('registryTestAgents', 'class AlphaAgent: pass\n', mtime = 1000000000)
+        self.assertEqual(self.registry.findModule('AlphaAgent'), ['registryTestAgents'])
+        self.writeModule('registryTestAgents', 'class AlphaAgent: pass\nclass BravoAgent: pass\n', mtime = 1000000000)
+        self.assertEqual(self.registry.findModule('BravoAgent'), ['registryTestAgents'])
+        self.assertEqual(self.indexedClasses(), {'registryTestAgents.py': ['AlphaAgent', 'BravoAgent']})
+
+    def testDropsModulesThatAreGone(self):
+        path = self.writeModule('registryTestGoneAgents', 'class AlphaAgent: pass\n')
+        self.writeModule('registryTestKeptAgents', 'class BravoAgent: pass\n')
+        self.assertEqual(self.registry.findModule('AlphaAgent'), ['registryTestGoneAgents'])
+        os.remove(path)
+        self.assertEqual(self.registry.findModule('AlphaAgent'), [])
+        self.assertEqual(self.indexedClasses(), {'registryTestKeptAgents.py': ['BravoAgent']})
+        self.assertEqual(agentRegistry.AgentRegistry(self.indexFile).findModule('AlphaAgent'), [])
+
+    def testUnparsableModule(self):
+        self.writeModule('registryTestBrokenAgents', 'class AlphaAgent(:\n')
+        self.assertEqual(self.registry.findModule('AlphaAgent'), [])
+        self.assertEqual(self.indexedClasses(), {'registryTestBrokenAgents.py': []})
+
+    def testModuleAndClassName(self):
+        self.writeModule('registryTestSpec', 'class AlphaAgent:\n    pass\n')
+        agent = self.registry.load('registryTestSpec:AlphaAgent')
+        self.assertEqual(agent.__name__, 'AlphaAgent')
+        self.assertEqual(agent.__module__, 'registryTestSpec')
+        self.assertRaises(Exception, self.registry.load, 'registryTestSpec:BravoAgent')
+        self.assertRaises(ImportError, self.registry.load, 'registryTestMissing:AlphaAgent')
+        # Naming the module skips the index
+        self.assertEqual(self.registry.modules, None)
+        self.assertFalse(os.path.exists(self.indexFile))
+
+    def testUnknownAgent(self):
+        self.writeModule('registryTestAgents', 'class AlphaAgent: pass\n')
+        self.assertRaises(Exception, self.registry.load, 'NoSuchAgent')
+
+    def testIndexOfAnotherVersionIsRebuilt(self):
+        f = open(self.indexFile, 'w')
+        json.dump({'version': agentRegistry.INDEX_VERSION + 1, 'modules': {'/nowhere/xAgents.py': {}}}, f)
+        f.close()
+        self.writeModule('registryTestAgents', 'class AlphaAgent: pass\n')
+        self.assertEqual(self.registry.findModule('AlphaAgent'), ['registryTestAgents'])
+        self.assertEqual(self.indexedClasses(), {'registryTestAgents.py': ['AlphaAgent']})
+        self.assertEqual([name for name in os.listdir(self.directory) if name.endswith('.tmp')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
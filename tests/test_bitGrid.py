@@ -0,0 +1,113 @@
+# test_bitGrid.py
+# ---------------
+# A BitGrid must behave like the Grid it stands in for.
+
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import layout
+from game import BitGrid, Grid
+
+layout.LAYOUT_CACHE_DIR = None  # Parse the layouts rather than compile them into the checkout
+
+
+def randomGrid(rng, width, height, density = 0.3):
+    grid = Grid(width, height)
+    for x in range(width):
+        for y in range(height):
+            grid[x][y] = rng.random() < density
+    return grid
+
+
+class BitGridTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.grids = [randomGrid(rng, width, height, density)
+                      for width, height in [(1, 1), (3, 5), (7, 4), (20, 11)]
+                      for density in [0.0, 0.3, 1.0]]
+        self.grids.append(layout.getLayout('bigSearch').food)
+
+    def testEquality(self):
+        for grid in self.grids:
+            bitGrid = grid.toBitGrid()
+            self.assertEqual(bitGrid, grid)
+            self.assertEqual(grid, bitGrid)
+            self.assertEqual(bitGrid, grid.toBitGrid())
+            self.assertEqual(bitGrid.toGrid(), grid)
+            self.assertNotEqual(bitGrid, None)
+            self.assertNotEqual(bitGrid, (~bitGrid))
+        self.assertNotEqual(BitGrid(2, 3), BitGrid(3, 2))
+
+    def testHash(self):
+        for grid in self.grids:
+            self.assertEqual(hash(grid.toBitGrid()), hash(grid))
+        self.assertEqual(len(set([grid.toBitGrid() for grid in self.grids[:3]])), 2)
+
+    def testCount(self):
+        for grid in self.grids:
+            bitGrid = grid.toBitGrid()
+            self.assertEqual(bitGrid.count(), grid.count())
+            self.assertEqual(bitGrid.count(False), grid.count(False))
+            for x in range(grid.width):
+                self.assertEqual(bitGrid[x].count(), grid[x].count(True))
+
+    def testAsList(self):
+        for grid in self.grids:
+            bitGrid = grid.toBitGrid()
+            self.assertEqual(bitGrid.asList(), grid.asList())
+            self.assertEqual(bitGrid.asList(False), grid.asList(False))
+
+    def testCells(self):
+        for grid in self.grids:
+            bitGrid = grid.toBitGrid()
+            self.assertEqual(len(bitGrid), grid.width)
+            for x in range(grid.width):
+                self.assertEqual(list(bitGrid[x]), grid[x])
+                self.assertEqual(bitGrid[x][-1], grid[x][-1])
+            self.assertEqual(bitGrid[-1][0], grid[-1][0])
+            self.assertEqual(str(bitGrid), str(grid))
+        self.assertRaises(IndexError, lambda: BitGrid(3, 2)[3])
+        self.assertRaises(IndexError, lambda: BitGrid(3, 2)[0][2])
+
+    def testCopyAndSet(self):
+        rng = random.Random(1)
+        for grid in self.grids:
+            bitGrid = grid.toBitGrid()
+            for i in range(20):
+                x, y = rng.randrange(grid.width), rng.randrange(grid.height)
+                value = rng.random() < 0.5
+                gridCopy = grid.copy()
+                gridCopy[x][y] = value
+                bitCopy = bitGrid.copy()
+                bitCopy[x][y] = value
+                self.assertEqual(bitCopy, gridCopy)
+                self.assertEqual(hash(bitCopy), hash(gridCopy))
+                self.assertEqual(bitCopy.count(), gridCopy.count())
+                self.assertEqual(bitGrid.withCell(x, y, value), grid.withCell(x, y, value))
+                # The originals are left alone
+                self.assertEqual(bitGrid, grid)
+                grid, bitGrid = gridCopy, bitCopy
+        self.assertRaises(IndexError, BitGrid(3, 2).withCell, 0, 2, True)
+
+    def testSetOperations(self):
+        rng = random.Random(2)
+        a = randomGrid(rng, 6, 5)
+        b = randomGrid(rng, 6, 5)
+        bitA, bitB = a.toBitGrid(), b.toBitGrid()
+        cells = [(x, y) for x in range(6) for y in range(5)]
+        self.assertEqual(set((bitA & bitB).asList()), set(a.asList()) & set(b.asList()))
+        self.assertEqual(set((bitA | bitB).asList()), set(a.asList()) | set(b.asList()))
+        self.assertEqual(set((bitA ^ bitB).asList()), set(a.asList()) ^ set(b.asList()))
+        self.assertEqual(set((bitA - bitB).asList()), set(a.asList()) - set(b.asList()))
+        self.assertEqual(set((~bitA).asList()), set(cells) - set(a.asList()))
+        self.assertRaises(Exception, lambda: bitA & BitGrid(5, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+# test_gameRecord.py
+# ------------------
+# A game written with GameRecorder reads back move for move, and seeking
+# through its keyframes reaches the same states as playing it from the start.
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import gameRecord
+import layout
+import pacman
+
+layout.LAYOUT_CACHE_DIR = None  # Parse the layouts rather than compile them into the checkout
+
+
+class StateCollector:
+    "A display that keeps every GameStateData it is shown"
+
+    def __init__(self):
+        self.shown = []
+
+    def initialize(self, data):
+        self.shown.append(data.deepCopy())
+
+    def update(self, data):
+        self.shown.append(data.deepCopy())
+
+    def finish(self):
+        pass
+
+
+def sameState(state, other):
+    "Equal GameStates whose agents also face the same way"
+    directions = [agentState.configuration.direction for agentState in state.data.agentStates]
+    otherDirections = [agentState.configuration.direction for agentState in other.data.agentStates]
+    return state == other and directions == otherDirections
+
+
+class GameRecordTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.directory, 'game.rec')
+        self.layout = layout.getLayout('smallClassic')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def playRandomGame(self, seed, **options):
+        "Records a game of random moves and returns the state after every move"
+        rng = random.Random(seed)
+        state = pacman.GameState()
+        state.initialize(self.layout, 2)
+        numAgents = state.getNumAgents()
+        recorder = gameRecord.GameRecorder(self.fileName, self.layout, numAgents, seed, **options)
+        states = [state]
+        agentIndex = 0
+        while not (state.isWin() or state.isLose()) and len(states) <= 300:
+            action = rng.choice(state.getLegalActions(agentIndex))
+            state = state.generateSuccessor(agentIndex, action)
+            recorder.record(agentIndex, action, state)
+            states.append(state)
+            agentIndex = (agentIndex + 1) % numAgents
+        recorder.close()
+        return states
+
+    def testRoundTrip(self):
+        states = self.playRandomGame(1, keyframeInterval = 0)
+        recorded = gameRecord.readGameRecord(self.fileName)
+        self.assertEqual(recorded.numAgents, 3)
+        self.assertEqual(recorded.seed, 1)
+        self.assertEqual(recorded.layout.layoutText, self.layout.layoutText)
+        self.assertEqual(len(recorded.actions), len(states) - 1)
+        self.assertEqual(recorded.keyframes, [])
+        self.assertTrue(sameState(pacman.seekRecordedGame(recorded, len(states) - 1), states[-1]))
+
+    def testSeekThroughKeyframes(self):
+        states = self.playRandomGame(2, keyframeInterval = 7, blockSize = 16)
+        recorded = gameRecord.readGameRecord(self.fileName)
+        self.assertEqual([moveIndex for moveIndex, payload in recorded.keyframes],
+                         list(range(7, len(states), 7)))
+        for moveIndex in range(len(states)):
+            keyframe = recorded.getKeyframe(moveIndex)
+            if moveIndex < 7:
+                self.assertEqual(keyframe, None)
+            else:
+                self.assertEqual(keyframe[0], moveIndex - moveIndex % 7)
+            self.assertTrue(sameState(pacman.seekRecordedGame(recorded, moveIndex), states[moveIndex]),
+                            'seeking to move %d' % moveIndex)
+        self.assertRaises(Exception, pacman.seekRecordedGame, recorded, len(states))
+
+    def testReplayFromKeyframe(self):
+        states = self.playRandomGame(3, keyframeInterval = 5)
+        recorded = gameRecord.readGameRecord(self.fileName)
+        startMove = len(states) // 2
+        display = StateCollector()
+        pacman.replayGame(recorded.layout, recorded.actions, display, recorded.numAgents - 1,
+                          pacman.seekRecordedGame(recorded, startMove), startMove)
+        self.assertEqual(len(display.shown), len(states) - startMove)
+        for data, state in zip(display.shown, states[startMove:]):
+            self.assertEqual(data, state.data)
+
+    def testTruncatedRecordKeepsWholeBlocks(self):
+        states = self.playRandomGame(4, keyframeInterval = 0, blockSize = 8)
+        f = open(self.fileName, 'rb')
+        data = f.read()
+        f.close()
+        f = open(self.fileName, 'wb')
+        f.write(data[:-3])
+        f.close()
+        recorded = gameRecord.readGameRecord(self.fileName)
+        moves = len(recorded.actions)
+        self.assertTrue(moves < len(states) - 1)
+        self.assertEqual(moves % 8, 0)
+        self.assertTrue(sameState(pacman.seekRecordedGame(recorded, moves), states[moves]))
+
+    def testRejectsOtherVersions(self):
+        self.playRandomGame(5)
+        f = open(self.fileName, 'r+b')
+        f.seek(len(gameRecord.MAGIC))
+        f.write(bytes([1]))
+        f.close()
+        self.assertRaises(Exception, gameRecord.readGameRecord, self.fileName)
+
+
+if __name__ == '__main__':
+    unittest.main()
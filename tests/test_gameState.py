@@ -0,0 +1,97 @@
+# test_gameState.py
+# -----------------
+# GameStateData caches its food count and Zobrist hashes; they must stay
+# right when the food or capsules of a writable state are changed in place.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import layout
+from game import Directions, ReadOnlyGrid
+from pacman import GameState
+
+layout.LAYOUT_CACHE_DIR = None  # Parse the layouts rather than compile them into the checkout
+
+
+def freshState(name):
+    state = GameState()
+    state.initialize(layout.Layout(layout.getLayout(name).layoutText), 0)
+    return state
+
+
+class FoodCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.state = freshState('tinySearch')
+        self.x, self.y = self.state.getFood().asList()[0]
+
+    def testHashAndEqualityAfterWritingDeepCopyFood(self):
+        written = self.state.deepCopy()
+        hash(written)  # Fill the cache before writing
+        written.getFood()[self.x][self.y] = False
+        replaced = self.state.deepCopy()
+        replaced.data.food = written.getFood().copy()
+        self.assertEqual(written, replaced)
+        self.assertEqual(hash(written), hash(replaced))
+        self.assertNotEqual(written, self.state)
+        self.assertNotEqual(hash(written), hash(self.state))
+
+    def testNumFoodAfterWritingDeepCopyFood(self):
+        state = self.state.deepCopy()
+        numFood = state.getNumFood()
+        state.getFood()[self.x][self.y] = False
+        self.assertEqual(state.getNumFood(), numFood - 1)
+        self.assertEqual(state.getNumFood(), state.getFood().count())
+        self.assertEqual(self.state.getNumFood(), numFood)
+
+    def testLastPelletAfterWritingFoodWins(self):
+        # testSearch has a pellet just West of Pacman and one further away
+        state = freshState('testSearch')
+        copy = state.deepCopy()
+        copy.getFood()[1][1] = False
+        self.assertEqual(copy.getNumFood(), 1)
+        copy = copy.generateSuccessor(0, Directions.WEST)
+        self.assertEqual(copy.getNumFood(), 0)
+        self.assertTrue(copy.isWin())
+
+    def testSuccessorsOfWritableStatesKeepTheirFood(self):
+        state = self.state.deepCopy()
+        successor = state.generateSuccessor(0, state.getLegalActions(0)[0])
+        self.assertTrue(isinstance(successor.getFood(), ReadOnlyGrid))
+        numFood, successorHash = successor.getNumFood(), hash(successor)
+        for x, y in state.getFood().asList():
+            state.getFood()[x][y] = False
+        self.assertEqual(successor.getNumFood(), numFood)
+        self.assertEqual(successor.getNumFood(), successor.getFood().count())
+        self.assertEqual(hash(successor), successorHash)
+
+    def testCapsulesChangedInPlace(self):
+        state = freshState('mediumClassic')
+        copy = state.deepCopy()
+        hash(copy)
+        capsule = copy.data.capsules.pop()
+        other = state.deepCopy()
+        other.data.capsules = copy.data.capsules[:]
+        self.assertEqual(copy, other)
+        self.assertEqual(hash(copy), hash(other))
+        copy.data.capsules.append(capsule)
+        self.assertEqual(hash(copy), hash(state))
+
+    def testEatingKeepsTheCacheRight(self):
+        state = freshState('tinySearch')
+        for action in [Directions.EAST, Directions.EAST, Directions.WEST, Directions.WEST, Directions.SOUTH]:
+            if action not in state.getLegalActions(0):
+                continue
+            state = state.generateSuccessor(0, action)
+            self.assertEqual(state.getNumFood(), state.getFood().count())
+            rebuilt = state.deepCopy()
+            rebuilt.data.food = state.getFood().copy()
+            self.assertEqual(hash(rebuilt), hash(state))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# test_layout.py
+# --------------
+# A compiled layout loads back the same as parsing the .lay file, and a
+# cache file that is cut short is parsed and compiled again.
+
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import layout
+
+LAYOUT_FILES = [os.path.join(ROOT, 'layouts', name + '.lay') for name in ['tinyMaze', 'mediumClassic', 'bigSearch']]
+
+
+def parseLayout(fileName):
+    f = open(fileName)
+    try:
+        return layout.Layout([line.strip() for line in f.read().splitlines()])
+    finally:
+        f.close()
+
+
+class CompiledLayoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+
+    def compiledFile(self):
+        names = glob.glob(os.path.join(self.cacheDir, '*.layc'))
+        self.assertEqual(len(names), 1)
+        return names[0]
+
+    def assertSameLayout(self, loaded, parsed):
+        self.assertEqual(loaded.width, parsed.width)
+        self.assertEqual(loaded.height, parsed.height)
+        self.assertEqual(loaded.layoutText, parsed.layoutText)
+        self.assertEqual(loaded.walls, parsed.walls)
+        self.assertEqual(loaded.food, parsed.food)
+        self.assertEqual(loaded.totalFood, parsed.totalFood)
+        self.assertEqual(loaded.capsules, parsed.capsules)
+        self.assertEqual(loaded.agentPositions, parsed.agentPositions)
+        self.assertEqual(loaded.getNumGhosts(), parsed.getNumGhosts())
+        self.assertEqual(list(loaded.getOpenCells()), list(parsed.getOpenCells()))
+        self.assertEqual(list(loaded.getNeighbors()), list(parsed.getNeighbors()))
+        self.assertEqual(loaded.getNeighborTable(), parsed.getNeighborTable())
+
+    def testCompileAndLoad(self):
+        for fileName in LAYOUT_FILES:
+            parsed = parseLayout(fileName)
+            first = layout.tryToLoad(fileName, self.cacheDir)
+            self.assertSameLayout(first, parsed)
+            compiledName = self.compiledFile()
+            loaded = layout.loadCompiledLayout(compiledName)
+            self.assertTrue(loaded is not None)
+            self.assertSameLayout(loaded, parsed)
+            self.assertSameLayout(layout.tryToLoad(fileName, self.cacheDir), parsed)
+            del first, loaded
+            os.remove(compiledName)
+
+    def testTruncatedCacheFile(self):
+        fileName = LAYOUT_FILES[1]
+        parsed = parseLayout(fileName)
+        layout.tryToLoad(fileName, self.cacheDir)
+        compiledName = self.compiledFile()
+        f = open(compiledName, 'rb')
+        data = f.read()
+        f.close()
+        textEnd = layout.COMPILED_HEADER.size + len('\n'.join(parsed.layoutText))
+        for length in [0, 10, layout.COMPILED_HEADER.size, textEnd - 5, textEnd + 3, len(data) // 2, len(data) - 1]:
+            f = open(compiledName, 'wb')
+            f.write(data[:length])
+            f.close()
+            self.assertEqual(layout.loadCompiledLayout(compiledName), None, 'truncated to %d bytes' % length)
+            self.assertSameLayout(layout.tryToLoad(fileName, self.cacheDir), parsed)
+            # The cache file was written again in full
+            self.assertEqual(os.path.getsize(compiledName), len(data))
+
+    def testCorruptHeader(self):
+        fileName = LAYOUT_FILES[0]
+        layout.tryToLoad(fileName, self.cacheDir)
+        compiledName = self.compiledFile()
+        f = open(compiledName, 'rb')
+        data = f.read()
+        f.close()
+        for corrupt in [b'XXXXXX' + data[6:], data[:6] + b'?' + data[7:], data + b'\0' * 4]:
+            f = open(compiledName, 'wb')
+            f.write(corrupt)
+            f.close()
+            self.assertEqual(layout.loadCompiledLayout(compiledName), None)
+        self.assertEqual(layout.loadCompiledLayout(os.path.join(self.cacheDir, 'missing.layc')), None)
+
+    def testMissingLayout(self):
+        self.assertEqual(layout.tryToLoad(os.path.join(self.cacheDir, 'missing.lay'), self.cacheDir), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# test_mazeDistances.py
+# ---------------------
+# The precomputed maze distances must agree with a breadth first search, and
+# a table saved to disk must load back the same.
+
+import collections
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import layout
+import searchAgents
+from game import Actions
+
+layout.LAYOUT_CACHE_DIR = None  # Parse the layouts rather than compile them into the checkout
+
+# The cells at (6, 3) and (5, 1) are walled in, so nothing else reaches them
+WALLED_IN_LAYOUT = ['%%%%%%%%',
+                    '%P  % .%',
+                    '% %%%%%%',
+                    '%.  % %%',
+                    '%%%%%%%%']
+
+
+def bfsDistances(walls, start):
+    "The maze distance from start to every cell reachable from it"
+    distances = {start: 0}
+    queue = collections.deque([start])
+    while queue:
+        cell = queue.popleft()
+        for neighbor in Actions.getLegalNeighbors(cell, walls):
+            if neighbor not in distances:
+                distances[neighbor] = distances[cell] + 1
+                queue.append(neighbor)
+    return distances
+
+
+class MazeDistancesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.layouts = [layout.Layout(WALLED_IN_LAYOUT), layout.getLayout('tinyMaze'),
+                        layout.getLayout('smallClassic')]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testDistancesMatchBreadthFirstSearch(self):
+        for lay in self.layouts:
+            walls = lay.walls
+            distances = searchAgents.MazeDistances(walls)
+            cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+            for start in cells:
+                expected = bfsDistances(walls, start)
+                for end in cells:
+                    self.assertEqual(distances.getDistance(start, end), expected.get(end))
+        distances = searchAgents.MazeDistances(self.layouts[0].walls)
+        self.assertEqual(distances.getDistance((1, 3), (6, 3)), None)
+        self.assertEqual(distances.getDistance((6, 3), (6, 3)), 0)
+
+    def testSaveAndLoad(self):
+        for lay in self.layouts:
+            walls = lay.walls
+            distances = searchAgents.MazeDistances(walls)
+            fileName = os.path.join(self.directory, 'distances.bin')
+            distances.save(fileName)
+            loaded = searchAgents.MazeDistances.load(walls, fileName)
+            self.assertEqual(loaded.cells, distances.cells)
+            self.assertEqual(loaded.matrix, distances.matrix)
+            self.assertEqual([name for name in os.listdir(self.directory) if name.endswith('.tmp')], [])
+
+    def testLoadRejectsTablesOfTheWrongSize(self):
+        walls = self.layouts[1].walls
+        fileName = os.path.join(self.directory, 'distances.bin')
+        searchAgents.MazeDistances(walls).save(fileName)
+        f = open(fileName, 'rb')
+        data = f.read()
+        f.close()
+        for corrupt in [data[:-1], data[:len(data) // 2], data + b'\0\0', b'']:
+            f = open(fileName, 'wb')
+            f.write(corrupt)
+            f.close()
+            self.assertEqual(searchAgents.MazeDistances.load(walls, fileName), None)
+        self.assertEqual(searchAgents.MazeDistances.load(walls, os.path.join(self.directory, 'missing.bin')), None)
+
+    def testCacheDirectory(self):
+        walls = self.layouts[2].walls.copy()
+        signature = searchAgents.MazeDistances.wallSignature(walls)
+        searchAgents.MAZE_DISTANCE_CACHE.pop(signature, None)
+        saved = searchAgents.getMazeDistances(walls, self.directory)
+        fileName = os.path.join(self.directory, 'mazeDistances-%s.bin' % signature)
+        self.assertTrue(os.path.exists(fileName))
+        # A fresh process would load the table from the file
+        searchAgents.MAZE_DISTANCE_CACHE.pop(signature)
+        loaded = searchAgents.getMazeDistances(walls.copy(), self.directory)
+        self.assertFalse(loaded is saved)
+        self.assertEqual(loaded.matrix, saved.matrix)
+
+
+if __name__ == '__main__':
+    unittest.main()
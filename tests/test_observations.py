@@ -0,0 +1,91 @@
+# test_observations.py
+# --------------------
+# Observations share the game's food, so agents must not be able to change
+# the game through them.
+
+import operator
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import layout
+import textDisplay
+from game import Agent, Directions, Grid, ReadOnlyGrid
+from pacman import ClassicGameRules, GameState
+
+
+class FoodWritingAgent(Agent):
+    "Tries to clear all the food in every observation it gets, then stops"
+
+    def __init__(self):
+        Agent.__init__(self, 0)
+        self.refused = 0
+
+    def getAction(self, state):
+        food = state.getFood()
+        for x, y in food.asList():
+            try:
+                food[x][y] = False
+            except Exception:
+                self.refused += 1
+            try:
+                food[x] = [False] * food.height
+            except Exception:
+                self.refused += 1
+        return Directions.STOP
+
+
+class ObservationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.layout = layout.Layout(['%%%%%%%', '%P . .%', '%.%%% %', '%.   .%', '%%%%%%%'])
+
+    def testAgentCannotWriteGameFood(self):
+        agent = FoodWritingAgent()
+        rules = ClassicGameRules(30)
+        game = rules.newGame(self.layout, agent, [], textDisplay.NullGraphics(), True)
+        before = game.state.getFood().copy()
+        numFood = game.state.getNumFood()
+        hashBefore = hash(game.state)
+
+        observation = game.state.makeObservation(0)
+        agent.getAction(observation)
+
+        self.assertTrue(agent.refused > 0)
+        self.assertEqual(game.state.getFood(), before)
+        self.assertEqual(game.state.getNumFood(), numFood)
+        self.assertEqual(observation.getNumFood(), numFood)
+        self.assertEqual(hash(game.state), hashBefore)
+
+    def testObservationFoodIsReadOnly(self):
+        state = GameState()
+        state.initialize(self.layout, 0)
+        food = state.makeObservation(0).getFood()
+        self.assertTrue(isinstance(food, ReadOnlyGrid))
+        self.assertRaises(TypeError, operator.setitem, food[3], 3, False)
+        self.assertRaises(Exception, operator.setitem, food, 3, [False] * food.height)
+
+    def testCopyOfObservationFoodIsWritable(self):
+        state = GameState()
+        state.initialize(self.layout, 0)
+        food = state.makeObservation(0).getFood().copy()
+        self.assertFalse(isinstance(food, ReadOnlyGrid))
+        food[3][3] = False
+        self.assertTrue(state.getFood()[3][3])
+
+    def testSuccessorsOfObservationsEatFood(self):
+        state = GameState()
+        state.initialize(self.layout, 0)
+        observation = state.makeObservation(0)
+        successor = observation.generateSuccessor(0, Directions.EAST).generateSuccessor(0, Directions.EAST)
+        self.assertEqual(successor.getNumFood(), state.getNumFood() - 1)
+        self.assertEqual(successor.getFood().count(), successor.getNumFood())
+        self.assertTrue(state.getFood()[3][3])
+        self.assertTrue(isinstance(successor.getFood(), Grid))
+
+
+if __name__ == '__main__':
+    unittest.main()
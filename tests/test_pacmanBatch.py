@@ -0,0 +1,131 @@
+# test_pacmanBatch.py
+# -------------------
+# BatchPacmanEnv must follow PacmanRules and GhostRules move for move: games
+# stepped in the batch and through GameState.generateSuccessor with the same
+# actions must stay identical.
+
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import numpy
+
+import layout
+from pacman import GameState
+from pacmanBatch import ACTIONS, ACTION_CODES, STOP, BatchPacmanEnv
+
+layout.LAYOUT_CACHE_DIR = None  # Parse the layouts rather than compile them into the checkout
+
+LAYOUTS = ['mediumClassic', 'smallClassic', 'originalClassic']
+GAMES = 15
+ROUNDS = 150
+
+# Small enough for random play to eat capsules and ghosts and to clear the board
+CAPSULE_LAYOUT = ['%%%%%%%%%',
+                  '%o.P. .G%',
+                  '%.%%%%%.%',
+                  '%. o  ..%',
+                  '%%%%%%%%%']
+
+
+class LockstepTest(unittest.TestCase):
+
+    def assertSameGame(self, env, i, state, where):
+        data = state.data
+        positions = [agentState.configuration.getPosition() for agentState in data.agentStates]
+        self.assertEqual((env.positions[i] / 2.0).tolist(), [list(position) for position in positions], where)
+        self.assertEqual([ACTIONS[code] for code in env.directions[i]],
+                         [agentState.configuration.getDirection() for agentState in data.agentStates], where)
+        self.assertEqual(env.scaredTimers[i].tolist(), [agentState.scaredTimer for agentState in data.agentStates],
+                         where)
+        self.assertEqual(env.food[i].tolist(), state.getFood().data, where)
+        self.assertEqual([capsule for capsule, left in zip(env.layout.capsules, env.capsules[i]) if left],
+                         state.getCapsules(), where)
+        self.assertEqual(int(env.scores[i]), state.getScore(), where)
+        self.assertEqual(bool(env.won[i]), state.isWin(), where)
+        self.assertEqual(bool(env.lost[i]), state.isLose(), where)
+        self.assertEqual(bool(env.done[i]), state.isWin() or state.isLose(), where)
+
+    def assertSameLegalActions(self, env, states, agentIndex, where):
+        legal = env.getLegalActions(agentIndex)
+        for i, state in enumerate(states):
+            if state.isWin() or state.isLose():
+                continue
+            self.assertEqual(set([ACTIONS[code] for code in numpy.flatnonzero(legal[i])]),
+                             set(state.getLegalActions(agentIndex)), '%s, game %d' % (where, i))
+
+    def playLockstep(self, name, lay, seed, games = GAMES, rounds = ROUNDS):
+        rng = random.Random(seed)
+        env = BatchPacmanEnv(seed)
+        env.reset(lay, games)
+        states = []
+        for i in range(games):
+            state = GameState()
+            state.initialize(lay, lay.getNumGhosts())
+            states.append(state)
+        numAgents = states[0].getNumAgents()
+
+        for round in range(rounds):
+            where = '%s, round %d' % (name, round)
+            self.assertSameLegalActions(env, states, 0, where)
+            pacmanActions = numpy.full(games, STOP, dtype = numpy.int8)
+            ghostActions = numpy.full((games, numAgents - 1), STOP, dtype = numpy.int8)
+            for i, state in enumerate(states):
+                for agentIndex in range(numAgents):
+                    if state.isWin() or state.isLose():
+                        break
+                    action = rng.choice(state.getLegalActions(agentIndex))
+                    if agentIndex == 0:
+                        pacmanActions[i] = ACTION_CODES[action]
+                    else:
+                        ghostActions[i, agentIndex - 1] = ACTION_CODES[action]
+                    state = state.generateSuccessor(agentIndex, action)
+                states[i] = state
+            env.step(pacmanActions, ghostActions)
+            for i, state in enumerate(states):
+                self.assertSameGame(env, i, state, '%s, game %d' % (where, i))
+            if env.done.all():
+                break
+        return states
+
+    def testLockstep(self):
+        endings = 0
+        for seed, name in enumerate(LAYOUTS):
+            states = self.playLockstep(name, layout.getLayout(name), seed)
+            endings += sum([state.isWin() or state.isLose() for state in states])
+        # The games get far enough to end, so dying is covered too
+        self.assertTrue(endings > 0)
+
+    def testLockstepWithCapsules(self):
+        lay = layout.Layout(CAPSULE_LAYOUT)
+        states = self.playLockstep('capsules', lay, 7, games = 200, rounds = 80)
+        self.assertTrue(any([state.isWin() for state in states]))
+        self.assertTrue(any([len(state.getCapsules()) < len(lay.capsules) for state in states]))
+
+    def testGhostLegalActions(self):
+        lay = layout.getLayout('smallClassic')
+        env = BatchPacmanEnv(0)
+        env.reset(lay, 1)
+        state = GameState()
+        state.initialize(lay, lay.getNumGhosts())
+        rng = random.Random(0)
+        for round in range(60):
+            for agentIndex in range(state.getNumAgents()):
+                self.assertSameLegalActions(env, [state], agentIndex, 'round %d' % round)
+                if state.isWin() or state.isLose():
+                    return
+                action = rng.choice(state.getLegalActions(agentIndex))
+                state = state.generateSuccessor(agentIndex, action)
+                if agentIndex == 0:
+                    env._movePacman(numpy.array([ACTION_CODES[action]], dtype = numpy.int8))
+                else:
+                    env._moveGhost(agentIndex, numpy.array([ACTION_CODES[action]], dtype = numpy.int8))
+                self.assertSameGame(env, 0, state, 'round %d, agent %d' % (round, agentIndex))
+
+
+if __name__ == '__main__':
+    unittest.main()
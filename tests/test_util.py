@@ -0,0 +1,157 @@
+# test_util.py
+# ------------
+# Tests for the priority queue, seed derivation and worker pools in util.py.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src'), os.path.join(ROOT, 'support')]
+
+import util
+
+
+def drain(queue):
+    items = []
+    while not queue.isEmpty():
+        items.append(queue.pop())
+    return items
+
+
+class PriorityQueueTest(unittest.TestCase):
+
+    def testPopsInPriorityOrder(self):
+        queue = util.PriorityQueue()
+        for item, priority in [('c', 3), ('a', 1), ('d', 4), ('b', 2)]:
+            queue.push(item, priority)
+        self.assertEqual(drain(queue), ['a', 'b', 'c', 'd'])
+
+    def testDecreaseKey(self):
+        queue = util.PriorityQueue()
+        queue.push('a', 1)
+        queue.push('b', 5)
+        queue.push('c', 3)
+        queue.update('b', 0)
+        self.assertEqual(queue.peekPriority(), 0)
+        self.assertEqual(drain(queue), ['b', 'a', 'c'])
+        self.assertTrue(queue.isEmpty())
+
+    def testIncreaseIsIgnored(self):
+        queue = util.PriorityQueue()
+        queue.push('a', 1)
+        queue.push('b', 2)
+        queue.update('a', 10)
+        queue.update('b', 2)
+        self.assertEqual(queue.peekPriority(), 1)
+        self.assertEqual(drain(queue), ['a', 'b'])
+
+    def testUpdateOfNewItemPushes(self):
+        queue = util.PriorityQueue()
+        queue.update('a', 2)
+        queue.update('b', 1)
+        self.assertEqual(drain(queue), ['b', 'a'])
+
+    def testTiesPopInPushOrder(self):
+        queue = util.PriorityQueue()
+        for item in ['x', 'y', 'z']:
+            queue.push(item, 7)
+        queue.push('w', 9)
+        queue.update('w', 7)
+        self.assertEqual(drain(queue), ['x', 'y', 'z', 'w'])
+
+    def testRepeatedDecreases(self):
+        queue = util.PriorityQueue()
+        for i in range(10):
+            queue.push(i, 100 + i)
+        for priority in [50, 20, 30, 10]:
+            queue.update(5, priority)
+        self.assertEqual(queue.peekPriority(), 10)
+        self.assertEqual(drain(queue), [5, 0, 1, 2, 3, 4, 6, 7, 8, 9])
+
+    def testEmptyAfterReplacedEntries(self):
+        queue = util.PriorityQueue()
+        queue.push('a', 3)
+        queue.update('a', 1)
+        self.assertFalse(queue.isEmpty())
+        self.assertEqual(queue.pop(), 'a')
+        self.assertTrue(queue.isEmpty())
+
+    def testContains(self):
+        queue = util.PriorityQueue()
+        self.assertFalse('a' in queue)
+        queue.push('a', 2)
+        queue.push('b', 1)
+        queue.update('a', 0)
+        self.assertTrue('a' in queue)
+        self.assertTrue('b' in queue)
+        self.assertFalse('c' in queue)
+        self.assertEqual(queue.pop(), 'a')
+        self.assertFalse('a' in queue)
+        self.assertEqual(queue.pop(), 'b')
+        self.assertFalse('b' in queue)
+        queue.push(['c'], 1)
+        self.assertTrue(['c'] in queue)
+        self.assertFalse(['d'] in queue)
+
+    def testUpdateAfterDuplicatePush(self):
+        queue = util.PriorityQueue()
+        queue.push('a', 3)
+        queue.push('a', 5)
+        self.assertEqual(queue.pop(), 'a')
+        self.assertTrue('a' in queue)
+        queue.update('a', 4)
+        self.assertEqual(queue.peekPriority(), 4)
+        self.assertEqual(drain(queue), ['a'])
+
+    def testUpdateReplacesLowestDuplicate(self):
+        queue = util.PriorityQueue()
+        queue.push('a', 6)
+        queue.push('a', 2)
+        queue.update('a', 3)
+        self.assertEqual(queue.peekPriority(), 2)
+        queue.update('a', 1)
+        queue.push('b', 4)
+        self.assertEqual(drain(queue), ['a', 'b', 'a'])
+
+    def testUnhashableItems(self):
+        queue = util.PriorityQueue()
+        queue.push(['a'], 4)
+        queue.push(['b'], 2)
+        queue.update(['a'], 1)
+        queue.update(['b'], 3)
+        queue.update(['c'], 5)
+        self.assertEqual(drain(queue), [['a'], ['b'], ['c']])
+
+    def testPriorityQueueWithFunction(self):
+        queue = util.PriorityQueueWithFunction(len)
+        for item in ['ccc', 'a', 'bb']:
+            queue.push(item)
+        self.assertEqual(drain(queue), ['a', 'bb', 'ccc'])
+
+
+class DerivedSeedTest(unittest.TestCase):
+
+    def testDependsOnlyOnItsArguments(self):
+        seed = util.derivedSeed(7, 3, 2)
+        self.assertEqual(util.derivedSeed(7, 3, 2), seed)
+        self.assertTrue(0 <= seed < 2 ** 64)
+        self.assertEqual(len(set([util.derivedSeed(7, 3, 2), util.derivedSeed(7, 2, 3), util.derivedSeed(7, 32),
+                                  util.derivedSeed(8, 3, 2), util.derivedSeed(7, 3)])), 5)
+
+    def testWorkersGetTheirSetup(self):
+        pool = util.workerPool(2, None, 'setup', 5)
+        try:
+            self.assertEqual(pool.map(_workerSeed, range(4)), [util.derivedSeed(5, i) for i in range(4)])
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+def _workerSeed(index):
+    name, baseSeed = util.workerSetup()
+    return util.derivedSeed(baseSeed, index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,8 +26,8 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+import collections
 import heapq
-import inspect
 import random
 import sys
 import io
@@ -157,54 +157,121 @@ class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     
     def __init__(self):
-        self.list = []
+        self.list = collections.deque()
     
     def push(self, item):
         "Enqueue the 'item' into the queue"
-        self.list.insert(0, item)
+        self.list.append(item)
     
     def pop(self):
         """
           Dequeue the earliest enqueued item still in the queue. This
           operation removes the item from the queue.
         """
-        return self.list.pop()
+        return self.list.popleft()
     
     def isEmpty(self):
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
 
+class BoundedQueue(Queue):
+    """
+      A FIFO queue that holds at most 'capacity' items (or any number when
+      capacity is None) and remembers the largest number of items it ever held
+      in 'highWaterMark'.  Pushing onto a full queue raises an exception rather
+      than silently dropping an item.
+    """
+    
+    def __init__(self, capacity = None):
+        Queue.__init__(self)
+        self.capacity = capacity
+        self.highWaterMark = 0
+    
+    def push(self, item):
+        "Enqueue the 'item' into the queue"
+        if self.capacity is not None and len(self.list) >= self.capacity:
+            raise Exception('Queue capacity of %d items exceeded' % self.capacity)
+        Queue.push(self, item)
+        if len(self.list) > self.highWaterMark:
+            self.highWaterMark = len(self.list)
+
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
       has a priority associated with it and the client is usually interested
       in quick retrieval of the lowest-priority item in the queue. This
       data structure allows O(1) access to the lowest-priority item.
+
+      For hashable items a dictionary remembers the queued entries of each
+      item, so membership tests are O(1) and update is O(log n): a decreased
+      priority is pushed as a new entry and the old one is skipped when it
+      reaches the top.  Unhashable items fall back to scanning the heap.
     """
     
     def __init__(self):
         self.heap = []
         self.count = 0
+        self.entries = {}  # item -> [(priority, count)] of its queued entries
+        self.removed = set()  # counts of the entries that update replaced
     
     def push(self, item, priority):
         entry = (priority, self.count, item)
         heapq.heappush(self.heap, entry)
         self.count += 1
+        try:
+            self.entries.setdefault(item, []).append((priority, entry[1]))
+        except TypeError:
+            pass  # Unhashable items are found by scanning the heap
     
     def pop(self):
-        (_, _, item) = heapq.heappop(self.heap)
+        self._dropRemoved()
+        (priority, count, item) = heapq.heappop(self.heap)
+        try:
+            queued = self.entries[item]
+        except TypeError:
+            return item
+        queued.remove((priority, count))
+        if not queued:
+            del self.entries[item]
         return item
     
     def isEmpty(self):
-        return len(self.heap) == 0
+        return len(self.heap) == len(self.removed)
+    
+    def __contains__(self, item):
+        try:
+            return item in self.entries
+        except TypeError:
+            return any(i == item and c not in self.removed for p, c, i in self.heap)
+    
+    def peekPriority(self):
+        "Returns the priority of the item pop would return, without removing it"
+        self._dropRemoved()
+        return self.heap[0][0]
     
     def update(self, item, priority):
-        # If item already in priority queue with higher priority, update its priority and rebuild the heap.
+        # If item already in priority queue with higher priority, update its priority.
         # If item already in priority queue with equal or lower priority, do nothing.
         # If item not in priority queue, do the same thing as self.push.
+        # An item pushed more than once has its lowest entry compared and replaced.
+        try:
+            queued = self.entries.get(item)
+        except TypeError:
+            self._updateUnhashable(item, priority)
+            return
+        if queued:
+            lowest = min(queued)
+            if lowest[0] <= priority:
+                return
+            queued.remove(lowest)
+            self.removed.add(lowest[1])
+        self.push(item, priority)
+    
+    def _updateUnhashable(self, item, priority):
         for index, (p, c, i) in enumerate(self.heap):
-            if i == item:
+            if i == item and c not in self.removed:
                 if p <= priority:
                     break
                 del self.heap[index]
@@ -213,6 +280,80 @@ class PriorityQueue:
                 break
         else:
             self.push(item, priority)
+    
+    def _dropRemoved(self):
+        "Pops the entries replaced by update off the top of the heap"
+        while self.heap and self.heap[0][1] in self.removed:
+            self.removed.discard(heapq.heappop(self.heap)[1])
+
+
+class BucketPriorityQueue:
+    """
+      Implements a bucket priority queue (Dial's algorithm) for small
+      non-negative integer priorities, such as path costs in a maze where
+      every step costs 1.  Items with the same priority share a FIFO bucket,
+      so push is O(1) and pop only scans forward over empty buckets, which is
+      O(1) amortized when priorities never drop below the last one popped.
+
+      As soon as a priority that is not a small non-negative integer is
+      pushed (e.g. a real-valued cost like .5**x), the queue falls back to a
+      binary heap.  Either way, items with equal priorities come out in the
+      order they were pushed, just like PriorityQueue.
+    """
+    MAX_BUCKETS = 4096
+    
+    def __init__(self):
+        self.buckets = []
+        self.current = 0  # no bucket below this one holds any items
+        self.size = 0
+        self.count = 0
+        self.heap = None
+    
+    def push(self, item, priority):
+        if self.heap is None and not self._fitsBucket(priority):
+            self._fallBackToHeap()
+        if self.heap is None:
+            priority = int(priority)
+            while len(self.buckets) <= priority:
+                self.buckets.append(collections.deque())
+            self.buckets[priority].append((self.count, item))
+            if priority < self.current:
+                self.current = priority
+            self.size += 1
+        else:
+            heapq.heappush(self.heap, (priority, self.count, item))
+        self.count += 1
+    
+    def pop(self):
+        if self.heap is not None:
+            (_, _, item) = heapq.heappop(self.heap)
+            return item
+        while not self.buckets[self.current]:
+            self.current += 1
+        self.size -= 1
+        (_, item) = self.buckets[self.current].popleft()
+        return item
+    
+    def isEmpty(self):
+        if self.heap is not None:
+            return len(self.heap) == 0
+        return self.size == 0
+    
+    def _fitsBucket(self, priority):
+        try:
+            return 0 <= priority < self.MAX_BUCKETS and priority == int(priority)
+        except (TypeError, ValueError, OverflowError):
+            return False
+    
+    def _fallBackToHeap(self):
+        "Moves every queued item into a binary heap, keeping the push order of ties"
+        self.heap = []
+        for priority in range(self.current, len(self.buckets)):
+            for count, item in self.buckets[priority]:
+                self.heap.append((priority, count, item))
+        heapq.heapify(self.heap)
+        self.buckets = []
+        self.size = 0
 
 
 class PriorityQueueWithFunction(PriorityQueue):
@@ -463,6 +604,7 @@ class Counter(dict):
 
 
 def raiseNotDefined():
+    import inspect
     fileName = inspect.stack()[1][1]
     line = inspect.stack()[1][2]
     method = inspect.stack()[1][3]
@@ -559,6 +701,44 @@ def chooseFromDistribution(distribution):
             return element
 
 
+def derivedSeed(baseSeed, *keys):
+    """
+    A 64-bit random seed for one piece of a run, such as a game, a batch of a
+    generation or an island's epoch, named by the integers in keys.  It
+    depends only on its arguments, so the pieces handed to a pool of worker
+    processes come out the same no matter how many workers there are or
+    which of them picks each piece up.
+    """
+    return random.Random('-'.join(['%d' % key for key in (baseSeed,) + keys])).getrandbits(64)
+
+
+# What the worker process this runs in was set up with (see workerPool)
+_WORKER_SETUP = None
+
+
+def _initWorker(makeSetup, args):
+    global _WORKER_SETUP
+    if makeSetup is None:
+        _WORKER_SETUP = args
+    else:
+        _WORKER_SETUP = makeSetup(*args)
+
+
+def workerPool(workers, makeSetup, *args):
+    """
+    Starts a multiprocessing.Pool of workers processes.  Each one calls
+    makeSetup(*args) once as it starts, or keeps args as they are if
+    makeSetup is None, and its tasks get the result from workerSetup().
+    """
+    import multiprocessing
+    return multiprocessing.Pool(workers, _initWorker, (makeSetup, args))
+
+
+def workerSetup():
+    "The setup of the worker process this runs in (see workerPool)"
+    return _WORKER_SETUP
+
+
 def nearestPoint(pos):
     """
     Finds the nearest grid point to a position (discretizes).